@@ -0,0 +1,78 @@
+from functools import cached_property
+
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin accepting ``fields=[...]`` to drop every other field.
+
+    ``field_sources`` maps a serializer field to the model fields it reads
+    when they differ from its own name, so views can ``.only()`` the
+    matching columns.
+    """
+    field_sources = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def model_fields_for(cls, fields, model):
+        names = {field.name for field in model._meta.concrete_fields}
+        sources = set()
+        for field in fields:
+            for source in cls.field_sources.get(field, (field,)):
+                if source in names:
+                    sources.add(source)
+        return sources
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin for ``?fields=a,b`` and ``?expand=relation``.
+
+    ``get_serializer`` trims the output to the requested fields and
+    ``sparse_queryset`` loads only the columns they need, plus
+    ``always_fields`` (the primary key and pagination keys).
+    """
+    always_fields = ('id',)
+    expandable = ()
+
+    @cached_property
+    def requested_fields(self):
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        fields = [name.strip() for name in raw.split(',') if name.strip()]
+        readable = {
+            name for name, field in self.get_serializer_class()(context=self.get_serializer_context()).fields.items()
+            if not field.write_only
+        }
+        unknown = sorted(set(fields) - readable)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}."})
+        return fields
+
+    @cached_property
+    def expanded(self):
+        raw = self.request.query_params.get('expand', '')
+        requested = {name.strip() for name in raw.split(',') if name.strip()}
+        unknown = sorted(requested - set(self.expandable))
+        if unknown:
+            raise ValidationError({'expand': f"Cannot expand: {', '.join(unknown)}."})
+        return requested
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs.setdefault('fields', self.requested_fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def sparse_queryset(self, queryset):
+        if self.requested_fields is None:
+            return queryset
+        serializer_class = self.get_serializer_class()
+        columns = serializer_class.model_fields_for(self.requested_fields, queryset.model)
+        return queryset.only(*columns, *self.always_fields)
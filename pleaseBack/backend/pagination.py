@@ -0,0 +1,23 @@
+from rest_framework.pagination import CursorPagination
+
+
+class BaseCursorPagination(CursorPagination):
+    """
+    Keyset pagination: each page is fetched with ``WHERE key > cursor``
+    instead of an OFFSET, so deep pages cost the same as the first one.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class PremiseCursorPagination(BaseCursorPagination):
+    ordering = 'id'
+
+
+class ReviewCursorPagination(BaseCursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class BookingCursorPagination(BaseCursorPagination):
+    ordering = ('-start_time', '-id')
@@ -0,0 +1,68 @@
+"""
+Row-streaming renderers for exports.
+
+Both render ordinary ``Response`` data (so errors still come out in the
+requested format) and, through ``header``/``rows``, encode an export one
+chunk of ``(value, ...)`` tuples at a time for ``StreamingHttpResponse``.
+"""
+import csv
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+
+class StreamingRowRenderer(BaseRenderer):
+    def header(self, columns):
+        return ''
+
+    def rows(self, columns, rows):
+        raise NotImplementedError
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        columns = list(items[0]) if items and isinstance(items[0], dict) else ['detail']
+        rows = [
+            tuple(item.get(column) for column in columns) if isinstance(item, dict) else (item,)
+            for item in items
+        ]
+        return (self.header(columns) + self.rows(columns, rows)).encode(self.charset)
+
+
+class CSVRenderer(StreamingRowRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    # Spreadsheets evaluate cells starting with these as formulas.
+    FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+    def _cell(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, str) and value.startswith(self.FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+    def _write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def header(self, columns):
+        return self._write([columns])
+
+    def rows(self, columns, rows):
+        return self._write([self._cell(value) for value in row] for row in rows)
+
+
+class NDJSONRenderer(StreamingRowRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def rows(self, columns, rows):
+        return ''.join(
+            json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+            for row in rows
+        )
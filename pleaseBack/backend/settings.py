@@ -7,6 +7,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
     "payments",
     "reviews",
     "mess",
+    "idempotency",
 ]
 
 
@@ -78,6 +80,7 @@ MIDDLEWARE = [
 # ------------------------------------------------------------------------------
 ROOT_URLCONF = "backend.urls"
 WSGI_APPLICATION = "backend.wsgi.application"
+ASGI_APPLICATION = "backend.asgi.application"
 
 
 # ------------------------------------------------------------------------------
@@ -112,6 +115,32 @@ DATABASES = {
 }
 
 
+# ------------------------------------------------------------------------------
+# Cache
+# ------------------------------------------------------------------------------
+# Premise payloads and cluster tiles are cached here, keyed by the premises
+# version (kept in the database, see premises.cache), so the local-memory
+# fallback is safe with several processes. Set REDIS_URL (requires the
+# redis package) to share the cached payloads between workers.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# Pub/sub used for the availability event stream (see premises.events).
+AVAILABILITY_BROKER = os.getenv("AVAILABILITY_BROKER", "premises.events.ChangeLogBroker")
+
+
 # ------------------------------------------------------------------------------
 # Password validation
 # ------------------------------------------------------------------------------
@@ -172,6 +201,14 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+
+# How long an Idempotency-Key is remembered, in seconds.
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# After this many seconds without an answer, a request holding a key is
+# presumed dead and a retry with the same key may run instead.
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
 CSRF_TRUSTED_ORIGINS = [
     "https://parkingspotfinder.onrender.com",
     "https://parking-backend-pypn.onrender.com",
@@ -220,6 +257,10 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
+# Sender used by the SMS outbox worker; set to bookings.sms.TwilioSmsProvider
+# once the Twilio account has credit.
+SMS_PROVIDER = os.getenv("SMS_PROVIDER", "bookings.sms.LoggingSmsProvider")
+
 
 # ------------------------------------------------------------------------------
 # Logging
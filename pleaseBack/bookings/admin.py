@@ -1,4 +1,6 @@
 from django.contrib import admin
-from .models import Booking
+from .models import Booking, OccupancyRollup, SmsOutbox
 # Register your models here.
-admin.site.register(Booking)
\ No newline at end of file
+admin.site.register(Booking)
+admin.site.register(SmsOutbox)
+admin.site.register(OccupancyRollup)
@@ -0,0 +1,259 @@
+"""
+Slot inventory for premises.
+
+``Premise.available`` is only ever changed with conditional UPDATE
+statements (``available = available - n WHERE available >= n``), so
+concurrent requests cannot lose updates or overbook it.
+
+Bookings also reserve a time window: ``reserve_many`` takes a slot in
+each ``SlotUsage`` bucket the window covers, with the same kind of
+conditional UPDATE (``booked = booked + 1 WHERE booked < total``).
+Future-dated bookings only take a counter slot once they start.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from premises.events import notify_availability_changed
+from premises.models import Premise
+from .models import Booking, SlotUsage
+from .rollups import record_status_change
+from .timeline import SLOT_BUCKET, bucket_floor, bucket_starts, invalidate_timelines, slot_buckets
+
+# Bookings starting within this long of "now" hold a slot immediately.
+IMMEDIATE_START_GRACE = timedelta(minutes=5)
+
+
+def release_many(counts):
+    """
+    Give back ``count`` slots per premise of a ``{premise_id: count}`` map,
+    never exceeding its total: one UPDATE per premise.
+    """
+    for premise_id, count in counts.items():
+        Premise.objects.filter(pk=premise_id).update(
+            available=Least(F('available') + count, F('total'))
+        )
+    if counts:
+        notify_availability_changed(list(counts))
+
+
+def _timelines_changed(premise_ids):
+    premise_ids = list(premise_ids)
+    transaction.on_commit(lambda: invalidate_timelines(premise_ids))
+
+
+class _Refused(Exception):
+    """Rolls back the savepoint of a window that does not fit."""
+
+
+def _create_buckets(spans):
+    """Insert the missing ``SlotUsage`` rows for ``(premise_id, first, last)`` spans."""
+    keys = sorted({
+        (premise_id, bucket)
+        for premise_id, first, last in spans
+        for bucket in bucket_starts(first, last)
+    })
+    SlotUsage.objects.bulk_create(
+        [SlotUsage(premise_id=premise_id, bucket=bucket) for premise_id, bucket in keys],
+        batch_size=500, ignore_conflicts=True,
+    )
+
+
+def reserve_many(windows):
+    """
+    Reserve a slot for each ``(premise_id, start, end)`` in ``windows``; must
+    run inside the transaction that creates the bookings. Returns one
+    ``(ok, slot_held)`` per window, in order. A window is accepted only if
+    every bucket it covers has a free slot, counting windows accepted
+    earlier in the same call; windows starting now also take a slot from
+    ``available``.
+
+    Each window is one conditional UPDATE over its buckets in a savepoint,
+    rolled back unless every bucket had room. Only those bucket rows (and
+    the premise row, for windows starting now) stay locked until commit,
+    so bookings for other times do not wait. Windows are applied in
+    (premise, start) order so concurrent calls lock shared buckets in the
+    same order.
+    """
+    results = [(False, False)] * len(windows)
+    if not windows:
+        return results
+
+    totals = dict(
+        Premise.objects
+        .filter(pk__in={premise_id for premise_id, _, _ in windows})
+        .values_list('id', 'total')
+    )
+    spans = {
+        index: slot_buckets(start, end)
+        for index, (premise_id, start, end) in enumerate(windows)
+        if premise_id in totals
+    }
+    _create_buckets((windows[index][0], *span) for index, span in spans.items())
+
+    hold_before = timezone.now() + IMMEDIATE_START_GRACE
+    holding = set()
+    for index in sorted(spans, key=lambda index: windows[index][:2]):
+        premise_id, start, _ = windows[index]
+        first, last = spans[index]
+        slot_held = start <= hold_before
+        try:
+            with transaction.atomic():
+                taken = (
+                    SlotUsage.objects
+                    .filter(premise_id=premise_id, bucket__gte=first, bucket__lt=last,
+                            booked__lt=totals[premise_id])
+                    .update(booked=F('booked') + 1)
+                )
+                if taken != (last - first) // SLOT_BUCKET:
+                    raise _Refused
+                if slot_held and not (
+                    Premise.objects
+                    .filter(pk=premise_id, available__gte=1)
+                    .update(available=F('available') - 1)
+                ):
+                    raise _Refused
+        except _Refused:
+            continue
+        if slot_held:
+            holding.add(premise_id)
+        results[index] = (True, slot_held)
+
+    if holding:
+        notify_availability_changed(holding)
+    _timelines_changed(totals)
+    return results
+
+
+def release_buckets(rows, now=None):
+    """
+    Give back the buckets of confirmed bookings (dicts with ``premise_id``,
+    ``start_time`` and ``end_time``) that are ending now: the ones from the
+    current bucket on. Call before releasing their ``available`` slots, so
+    locks are taken in the same order as ``reserve_many``.
+    """
+    current = bucket_floor(now or timezone.now())
+    released = Counter()
+    for row in rows:
+        first, last = slot_buckets(row['start_time'], row['end_time'])
+        first = max(first, current)
+        if first < last:
+            released[row['premise_id'], first, last] += 1
+    for (premise_id, first, last), count in sorted(released.items()):
+        SlotUsage.objects.filter(premise_id=premise_id, bucket__gte=first, bucket__lt=last).update(
+            booked=Greatest(F('booked') - count, 0)
+        )
+
+
+def purge_past_buckets(now=None):
+    """Delete bucket rows that ended before the current one. Returns how many."""
+    deleted, _ = SlotUsage.objects.filter(bucket__lt=bucket_floor(now or timezone.now())).delete()
+    return deleted
+
+
+def reserve_booking(premise_id, start, end):
+    """``reserve_many`` for a single window."""
+    return reserve_many([(premise_id, start, end)])[0]
+
+
+def activate_started_bookings(now=None, batch_size=500):
+    """
+    Let confirmed future bookings that have now started take their slot.
+    Returns the number of bookings activated.
+    """
+    now = now or timezone.now()
+    activated = 0
+    while True:
+        with transaction.atomic():
+            due = list(
+                Booking.objects
+                .select_for_update()
+                .filter(status='confirmed', slot_held=False, start_time__lte=now)
+                .order_by('start_time')
+                .values_list('id', 'premise_id')[:batch_size]
+            )
+            if not due:
+                return activated
+            Booking.objects.filter(id__in=[booking_id for booking_id, _ in due]).update(slot_held=True)
+            # Window checks already kept these within capacity; the floor
+            # only guards against a counter that was edited by hand.
+            for premise_id, count in Counter(premise_id for _, premise_id in due).items():
+                Premise.objects.filter(pk=premise_id).update(
+                    available=Greatest(F('available') - count, 0)
+                )
+            notify_availability_changed({premise_id for _, premise_id in due})
+        activated += len(due)
+
+
+# Columns ``_finish_rows`` needs: slot bookkeeping plus the rollup fields.
+FINISH_FIELDS = ('id', 'slot_held', *Booking.ROLLUP_FIELDS)
+
+
+def _finish_rows(rows, status, now=None):
+    """Move locked confirmed booking rows (``FINISH_FIELDS`` dicts) to ``status`` and release their slots."""
+    finished = [row['id'] for row in rows]
+    Booking.objects.filter(id__in=finished, status='confirmed').update(status=status)
+    release_buckets(rows, now)
+    release_many(Counter(row['premise_id'] for row in rows if row['slot_held']))
+    record_status_change(rows, status)
+    _timelines_changed({row['premise_id'] for row in rows})
+    return finished
+
+
+def finish_bookings(user, status, booking_ids=None, premise_id=None):
+    """
+    Move ``user``'s confirmed bookings to ``status`` ('cancelled' or
+    'completed'): those in ``booking_ids``, and/or all of them at
+    ``premise_id``. Statuses change with one UPDATE and held slots are
+    released with one UPDATE per premise, in one transaction. Returns the
+    ids that were moved; bookings that are not confirmed are left alone.
+    """
+    with transaction.atomic():
+        # Row locks keep a concurrent transition or activation from
+        # changing these bookings under us.
+        queryset = Booking.objects.select_for_update().filter(user=user, status='confirmed')
+        if booking_ids is not None:
+            queryset = queryset.filter(id__in=booking_ids)
+        if premise_id is not None:
+            queryset = queryset.filter(premise_id=premise_id)
+        rows = list(queryset.values(*FINISH_FIELDS))
+        if not rows:
+            return []
+        return _finish_rows(rows, status)
+
+
+def complete_expired_bookings(now=None, batch_size=500):
+    """
+    Complete confirmed bookings whose end_time has passed, ``batch_size``
+    at a time. Each batch is its own short transaction (one UPDATE for the
+    statuses, one per premise for the slots), so a large backlog never
+    holds locks for long; rows a user is cancelling right now are skipped
+    and picked up by the next run. Returns the number completed.
+    """
+    now = now or timezone.now()
+    completed = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Booking.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='confirmed', end_time__lte=now)
+                .order_by('end_time')
+                .values(*FINISH_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return completed
+            _finish_rows(rows, 'completed', now)
+        completed += len(rows)
+
+
+def finish_booking(booking_id, user, status):
+    """
+    ``finish_bookings`` for one booking. Returns False if there is no such
+    confirmed booking, including when a concurrent request got there first.
+    """
+    return bool(finish_bookings(user, status, booking_ids=[booking_id]))
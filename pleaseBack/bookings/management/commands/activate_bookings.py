@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bookings.inventory import activate_started_bookings
+
+
+class Command(BaseCommand):
+    help = "Let future bookings that have started take their slot from the premise's available count"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        activated = activate_started_bookings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Activated {activated} bookings."))
@@ -0,0 +1,174 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from bookings.models import Booking
+from premises.models import Premise
+
+User = get_user_model()
+
+# (status, share of seeded bookings)
+STATUS_MIX = [('completed', 0.80), ('cancelled', 0.12), ('confirmed', 0.08)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN plans and timings for the hot Booking queries with and "
+        "without Booking.Meta.indexes. A synthetic dataset is inserted inside "
+        "a transaction that is rolled back afterwards; works on SQLite and "
+        "PostgreSQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=200000)
+        parser.add_argument('--premises', type=int, default=500)
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Executions of each query per phase')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+        self.stdout.write(f"Database: {connection.vendor}, {options['bookings']} bookings")
+
+        with transaction.atomic():
+            users, premises, bookings = self._seed(rng, now, options)
+            queries = self._queries(rng, now, users, premises, bookings, options['queries'])
+
+            self._set_indexes(create=False)
+            before = self._measure(queries)
+            self._set_indexes(create=True)
+            after = self._measure(queries)
+
+            transaction.set_rollback(True)
+
+        for name in queries:
+            self.stdout.write(f"\n== {name}")
+            self.stdout.write("-- without indexes")
+            self.stdout.write(before[name][1])
+            self.stdout.write("-- with indexes")
+            self.stdout.write(after[name][1])
+
+        self.stdout.write(f"\n{'query':<22} {'before ms/q':>12} {'after ms/q':>12} {'speedup':>8}")
+        for name in queries:
+            before_ms, after_ms = before[name][0], after[name][0]
+            self.stdout.write(
+                f"{name:<22} {before_ms:>12.3f} {after_ms:>12.3f} "
+                f"{before_ms / after_ms if after_ms else 0:>7.1f}x"
+            )
+
+    def _seed(self, rng, now, options, batch_size=5000):
+        users = User.objects.bulk_create([
+            User(username=f"bench-{i}", email=f"bench-{i}@example.com", password='!')
+            for i in range(options['users'])
+        ])
+        premises = Premise.objects.bulk_create([
+            Premise(
+                name=f"Bench {i}", location="Benchmark", latitude=22.3, longitude=73.18,
+                price="₹20/hour", available=10, total=10,
+            )
+            for i in range(options['premises'])
+        ])
+        statuses = [status for status, _ in STATUS_MIX]
+        weights = [share for _, share in STATUS_MIX]
+
+        booking_ids = []
+        for start in range(0, options['bookings'], batch_size):
+            batch = []
+            for _ in range(min(batch_size, options['bookings'] - start)):
+                status = rng.choices(statuses, weights)[0]
+                # History spreads over two years; confirmed bookings cluster
+                # around now and the next month.
+                if status == 'confirmed':
+                    start_time = now + timedelta(hours=rng.uniform(-6, 24 * 30))
+                else:
+                    start_time = now - timedelta(hours=rng.uniform(1, 24 * 730))
+                duration = rng.randint(1, 8)
+                batch.append(Booking(
+                    user=rng.choice(users), premise=rng.choice(premises),
+                    name="Bench", phone="9876543210", duration=duration,
+                    start_time=start_time, end_time=start_time + timedelta(hours=duration),
+                    total_price=20 * duration, status=status,
+                    slot_held=status != 'confirmed' or start_time <= now,
+                ))
+            booking_ids.extend(booking.id for booking in Booking.objects.bulk_create(batch))
+        return users, premises, booking_ids
+
+    def _queries(self, rng, now, users, premises, booking_ids, count):
+        """Each query is a list of ``count`` querysets with varied parameters."""
+        def window():
+            start = now + timedelta(hours=rng.uniform(0, 24 * 30))
+            return start, start + timedelta(hours=rng.randint(1, 8))
+
+        def overlap(premise):
+            start, end = window()
+            return Booking.objects.filter(
+                premise=premise, status='confirmed', start_time__lt=end, end_time__gt=start,
+            ).values_list('start_time', 'end_time')
+
+        return {
+            'user_bookings': [
+                Booking.objects.filter(user=rng.choice(users)).order_by('-start_time', '-id')[:50]
+                for _ in range(count)
+            ],
+            'user_bookings_status': [
+                Booking.objects.filter(user=rng.choice(users), status='confirmed')
+                .order_by('-start_time', '-id')[:50]
+                for _ in range(count)
+            ],
+            'cancel_lookup': [
+                Booking.objects.filter(id=rng.choice(booking_ids), user=rng.choice(users), status='confirmed')
+                .values_list('premise_id', 'slot_held')
+                for _ in range(count)
+            ],
+            'premise_overlap': [overlap(rng.choice(premises)) for _ in range(count)],
+            'premise_timeline': [
+                Booking.objects.filter(premise=rng.choice(premises), status='confirmed', end_time__gt=now)
+                .values_list('start_time', 'end_time')
+                for _ in range(count)
+            ],
+            'expired_sweep': [
+                Booking.objects.filter(status='confirmed', end_time__lte=now)
+                .order_by('end_time').values_list('id', 'premise_id', 'slot_held')[:500]
+                for _ in range(count)
+            ],
+            'pending_activation': [
+                Booking.objects.filter(status='confirmed', slot_held=False, start_time__lte=now)
+                .order_by('start_time').values_list('id', 'premise_id')[:500]
+                for _ in range(count)
+            ],
+        }
+
+    def _set_indexes(self, create):
+        # Raw DDL: the SQLite schema editor refuses to run inside atomic().
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for index in Booking._meta.indexes:
+                if create:
+                    sql = str(index.create_sql(Booking, schema_editor))
+                else:
+                    sql = schema_editor.sql_delete_index % {
+                        'name': schema_editor.quote_name(index.name),
+                        'table': schema_editor.quote_name(Booking._meta.db_table),
+                    }
+                cursor.execute(sql)
+            cursor.execute('ANALYZE')
+
+    def _measure(self, queries):
+        results = {}
+        for name, querysets in queries.items():
+            plan = querysets[0].explain()
+            for queryset in querysets[:5]:
+                list(queryset._chain())  # warm the page cache
+            started = time.perf_counter()
+            for queryset in querysets:
+                list(queryset._chain())
+            elapsed_ms = (time.perf_counter() - started) * 1000 / len(querysets)
+            results[name] = (elapsed_ms, plan)
+        return results
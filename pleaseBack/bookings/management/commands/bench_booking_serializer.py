@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.models import Booking
+from bookings.serializers import BookingRowSerializer, BookingSerializer
+from premises.models import Premise
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/second of BookingSerializer and the BookingRowSerializer "
+        "fast path over one user's bookings. Synthetic bookings are inserted "
+        "inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--premises', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per variant; the best is reported')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            user = self._seed(rng, options)
+            bookings = Booking.objects.filter(user=user).order_by('-start_time', '-id')
+
+            def model_serializer(expand):
+                queryset = bookings.select_related('premise') if expand else bookings
+                return BookingSerializer(queryset, many=True, expand_premise=expand).data
+
+            def row_serializer(expand):
+                rows = BookingRowSerializer(expand_premise=expand)
+                return rows.render(list(bookings.values(*rows.value_fields())))
+
+            self.stdout.write(f"{'variant':<32} {'ms':>10} {'rows/s':>12}")
+            for expand in (False, True):
+                timings = {}
+                for label, render in (('BookingSerializer', model_serializer), ('BookingRowSerializer', row_serializer)):
+                    best = min(self._time(render, expand) for _ in range(options['repeat']))
+                    timings[label] = best
+                    name = f"{label}{' +premise' if expand else ''}"
+                    self.stdout.write(f"{name:<32} {best * 1000:>10.1f} {options['bookings'] / best:>12.0f}")
+                self.stdout.write(
+                    f"{'speedup':<32} {timings['BookingSerializer'] / timings['BookingRowSerializer']:>10.1f}x"
+                )
+
+            transaction.set_rollback(True)
+
+    def _time(self, render, expand):
+        started = time.perf_counter()
+        render(expand)
+        return time.perf_counter() - started
+
+    def _seed(self, rng, options):
+        user = User.objects.create_user('bench-serializer', 'bench-serializer@example.com', None)
+        premises = Premise.objects.bulk_create([
+            Premise(
+                name=f"Bench {i}", location="Benchmark", latitude=22.3, longitude=73.18,
+                price="₹20/hour", available=10, total=10,
+            )
+            for i in range(options['premises'])
+        ])
+        now = timezone.now()
+        batch = []
+        for _ in range(options['bookings']):
+            start_time = now - timedelta(hours=rng.uniform(1, 24 * 730))
+            duration = rng.randint(1, 8)
+            batch.append(Booking(
+                user=user, premise=rng.choice(premises), name="Bench", phone="9876543210",
+                duration=duration, start_time=start_time,
+                end_time=start_time + timedelta(hours=duration),
+                total_price=20 * duration, status=rng.choice(['completed', 'cancelled']),
+            ))
+        Booking.objects.bulk_create(batch, batch_size=5000)
+        return user
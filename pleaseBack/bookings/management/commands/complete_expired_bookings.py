@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.inventory import activate_started_bookings, complete_expired_bookings, purge_past_buckets
+
+
+class Command(BaseCommand):
+    help = (
+        "Complete confirmed bookings whose end time has passed and return their slots; "
+        "also lets started future bookings take theirs and drops past slot buckets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep running, sweeping every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            # Complete first: a future booking that started and ended
+            # between runs then never takes a slot at all.
+            completed = complete_expired_bookings(batch_size=options['batch_size'])
+            activated = activate_started_bookings(batch_size=options['batch_size'])
+            purged = purge_past_buckets()
+            self.stdout.write(
+                f"Completed {completed}, activated {activated} bookings; purged {purged} slot buckets."
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
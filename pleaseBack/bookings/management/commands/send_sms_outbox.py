@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued SMS messages from the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--once', action='store_true',
+                            help='Drain what is due now and exit instead of polling')
+        parser.add_argument('--idle-sleep', type=float, default=5.0,
+                            help='Seconds to wait when nothing is due')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = drain_outbox(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['idle_sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} messages, {total_failed} failed attempts."))
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_alter_booking_options_and_more'),
+        ('premises', '0002_premise_geo_cell'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'start_time'], name='booking_user_start_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_cursor_pagination_indexes'),
+        ('premises', '0005_premise_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='slot_held',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['premise', 'status', 'start_time', 'end_time'], name='booking_premise_window_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('slot_held', False), ('status', 'confirmed')), fields=['start_time'], name='booking_pending_hold_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_sms_outbox'),
+        ('premises', '0005_premise_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'confirmed')), fields=['end_time'], name='booking_confirmed_end_idx'),
+        ),
+    ]
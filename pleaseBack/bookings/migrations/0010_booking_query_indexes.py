@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_booking_status_end_index'),
+        ('premises', '0005_premise_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_premise_window_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'status', 'start_time'], name='booking_user_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'confirmed')), fields=['premise', 'end_time', 'start_time'], name='booking_confirmed_window_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_booking_query_indexes'),
+        ('premises', '0005_premise_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('booked_seconds', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('bookings', models.IntegerField(default=0)),
+                ('cancellations', models.IntegerField(default=0)),
+                ('premise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_rollups', to='premises.premise')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('premise', 'hour'), name='occupancy_rollup_premise_hour')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:45
+
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+from bookings.timeline import bucket_floor, bucket_starts, slot_buckets
+
+
+def populate_slot_usage(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    SlotUsage = apps.get_model('bookings', 'SlotUsage')
+    current = bucket_floor(timezone.now())
+    booked = Counter()
+    bookings = (
+        Booking.objects
+        .filter(status='confirmed', end_time__gt=current)
+        .values_list('premise_id', 'start_time', 'end_time')
+        .iterator(chunk_size=2000)
+    )
+    for premise_id, start, end in bookings:
+        first, last = slot_buckets(start, end)
+        for bucket in bucket_starts(max(first, current), last):
+            booked[premise_id, bucket] += 1
+    SlotUsage.objects.bulk_create(
+        [SlotUsage(premise_id=premise_id, bucket=bucket, booked=count)
+         for (premise_id, bucket), count in booked.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_occupancy_rollups'),
+        ('premises', '0007_premisechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('booked', models.IntegerField(default=0)),
+                ('premise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_usage', to='premises.premise')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('premise', 'bucket'), name='slot_usage_premise_bucket')],
+            },
+        ),
+        migrations.RunPython(populate_slot_usage, migrations.RunPython.noop),
+    ]
@@ -2,9 +2,10 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from premises.models import Premise
 from django.utils import timezone
-from .utils import send_sms
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from .quotes import forget_rate, quote
 
 
 User = get_user_model()
@@ -26,42 +27,219 @@ class Booking(models.Model):
     end_time = models.DateTimeField()
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='confirmed')
+    # Whether this booking currently holds one of the premise's ``available``
+    # slots. Future bookings take theirs when they start (see
+    # ``bookings.inventory.activate_started_bookings``).
+    slot_held = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            # My bookings, newest first, optionally by status.
+            models.Index(fields=['user', 'start_time'], name='booking_user_start_idx'),
+            models.Index(fields=['user', 'status', 'start_time'], name='booking_user_status_start_idx'),
+            # Overlap checks and timelines only look at confirmed bookings
+            # that have not ended yet, so lead with end_time.
+            models.Index(
+                fields=['premise', 'end_time', 'start_time'],
+                condition=models.Q(status='confirmed'),
+                name='booking_confirmed_window_idx',
+            ),
+            # Sweeps: bookings to complete, future bookings to activate.
+            models.Index(
+                fields=['end_time'],
+                condition=models.Q(status='confirmed'),
+                name='booking_confirmed_end_idx',
+            ),
+            models.Index(
+                fields=['start_time'],
+                condition=models.Q(slot_held=False, status='confirmed'),
+                name='booking_pending_hold_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.premise.name}"
 
+    # Fields the quote is computed from (attnames), and the fields it sets.
+    QUOTE_INPUTS = ('premise_id', 'start_time', 'duration')
+    QUOTE_OUTPUTS = ('end_time', 'total_price')
+    # Fields the hourly occupancy rollups are computed from (see ``bookings.rollups``).
+    ROLLUP_FIELDS = ('premise_id', 'start_time', 'end_time', 'total_price', 'status')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._quoted_inputs = instance._quote_inputs()
+        instance._rollup_state = instance._current_rollup_state()
+        return instance
+
+    def _quote_inputs(self):
+        # Deferred fields are missing from __dict__; reading them would query.
+        return tuple(self.__dict__.get(name) for name in self.QUOTE_INPUTS)
+
+    def _current_rollup_state(self):
+        state = tuple(self.__dict__.get(name) for name in self.ROLLUP_FIELDS)
+        return None if None in state else state
+
+    def apply_quote(self):
+        """Set end_time and total_price from start_time, duration and the premise's rate."""
+        quoted = quote(self.premise_id, self.start_time, self.duration)
+        self.end_time, self.total_price = quoted.end_time, quoted.total_price
+        self._quoted_inputs = self._quote_inputs()
+
     def save(self, *args, **kwargs):
-        # Set start_time to current time if not specified
-        if not self.pk:  # Only for new bookings
-            self.start_time = timezone.now()
-        
-        # Calculate end_time based on start_time and duration
-        self.end_time = self.start_time + timezone.timedelta(hours=self.duration)
-        
-        # Calculate price
-        try:
-            price_str = self.premise.price
-            price_per_hour = int(''.join(filter(str.isdigit, price_str.split('/')[0])))
-            self.total_price = price_per_hour * self.duration
-        except (ValueError, IndexError, AttributeError):
-            self.total_price = 0
-        
+        update_fields = kwargs.get('update_fields')
+        if self._state.adding:
+            # Set start_time to current time if not specified
+            if self.start_time is None:
+                self.start_time = timezone.now()
+            self.apply_quote()
+        elif (
+            (
+                update_fields is None
+                or {self._meta.get_field(name).attname for name in update_fields} & set(self.QUOTE_INPUTS)
+            )
+            and self._quote_inputs() != getattr(self, '_quoted_inputs', None)
+        ):
+            # Re-quote only when the premise, duration or start actually
+            # changed, so status-only saves stay a single UPDATE.
+            self.apply_quote()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.QUOTE_OUTPUTS}
+
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        self._record_rollup(adding, kwargs.get('update_fields'))
+
+    def _record_rollup(self, adding, update_fields):
+        """Keep the hourly occupancy rollups in step, in the same transaction."""
+        from .rollups import record_change
+
+        before = None if adding else getattr(self, '_rollup_state', None)
+        if not adding and before is None:
+            # Loaded with deferred rollup fields (or never loaded): the old
+            # state is unknown, so leave it to ``rebuild_occupancy_rollups``.
+            return
+        after = self._current_rollup_state()
+        if before is not None and update_fields is not None:
+            # Only the saved fields changed in the database.
+            saved = {self._meta.get_field(name).attname for name in update_fields}
+            after = tuple(
+                new if name in saved else old
+                for name, old, new in zip(self.ROLLUP_FIELDS, before, after or before)
+            )
+        if after != before:
+            record_change(before, after)
+        self._rollup_state = after
+
+class SmsOutbox(models.Model):
+    """
+    Outgoing SMS, written in the same transaction as the change it reports
+    and delivered by ``python manage.py send_sms_outbox``.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='sms_messages')
+    phone = models.CharField(max_length=20)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='sms_outbox_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"SMS to {self.phone} ({self.status})"
+
+class OccupancyRollup(models.Model):
+    """
+    Per premise and UTC hour: slot time booked (confirmed and completed
+    bookings, split across the hours they cover), plus revenue, bookings
+    and cancellations counted in the hour a booking starts. Maintained by
+    ``bookings.rollups``.
+    """
+    premise = models.ForeignKey(Premise, on_delete=models.CASCADE, related_name='occupancy_rollups')
+    hour = models.DateTimeField()
+    booked_seconds = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    bookings = models.IntegerField(default=0)
+    cancellations = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['premise', 'hour'], name='occupancy_rollup_premise_hour'),
+        ]
+
+    def __str__(self):
+        return f"{self.premise_id} @ {self.hour:%Y-%m-%d %H:00}"
+
+    @property
+    def booked_slot_hours(self):
+        return self.booked_seconds / 3600
+
+class SlotUsage(models.Model):
+    """
+    Slots reserved at a premise during one ``SLOT_BUCKET`` (see
+    ``bookings.timeline.slot_buckets``). A reservation takes a slot in every
+    bucket of its window with one conditional UPDATE, so concurrent bookings
+    only contend on the buckets they share. Maintained by
+    ``bookings.inventory``.
+    """
+    premise = models.ForeignKey(Premise, on_delete=models.CASCADE, related_name='slot_usage')
+    bucket = models.DateTimeField()
+    booked = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['premise', 'bucket'], name='slot_usage_premise_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.premise_id} @ {self.bucket:%Y-%m-%d %H:%M}: {self.booked}"
+
+@receiver([post_save, post_delete], sender=Premise)
+def invalidate_premise_rate(sender, instance, **kwargs):
+    # Forget now and again after commit, so no other request re-caches the
+    # old rate in between.
+    premise_id = instance.pk
+    forget_rate(premise_id)
+    transaction.on_commit(lambda: forget_rate(premise_id))
+
+@receiver(post_save, sender=Booking)
+def invalidate_booking_timeline(sender, instance, **kwargs):
+    from .timeline import invalidate_timelines
+
+    premise_id = instance.premise_id
+    transaction.on_commit(lambda: invalidate_timelines([premise_id]))
 
 @receiver(post_save, sender=Booking)
 def send_booking_sms(sender, instance, created, **kwargs):
+    from .notifications import queue_booking_confirmations
+
     if created:
-        try:
-            message = (
-                f"Parking Booking Confirmed\n"
-                f"Location: {instance.premise.name}\n"
-                f"Duration: {instance.duration} hours\n"
-                f"Total: INR {instance.total_price}\n"
-                f"Booking ID: {instance.id}\n"
-                f"Start Time: {instance.start_time.strftime('%Y-%m-%d %H:%M')}\n"
-                f"Thank you for using letsPark!"
-            )
-            send_sms(instance.phone, message)
-        except Exception as e:
-            # Prevent any signal error from crashing the transaction/request
-            print(f"Error in send_booking_sms signal: {e}")
+        queue_booking_confirmations([instance])
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_from_rollups(sender, instance, origin=None, **kwargs):
+    from .rollups import record_change
+
+    if isinstance(origin, Premise) or getattr(origin, 'model', None) is Premise:
+        # The premise's rollups are deleted along with it.
+        return
+    state = getattr(instance, '_rollup_state', None) or instance._current_rollup_state()
+    if state is not None:
+        record_change(state, None)
@@ -0,0 +1,28 @@
+"""
+Booking confirmation messages.
+
+Confirmations are written to ``SmsOutbox`` in the transaction that
+creates the bookings, so they exist exactly when the bookings do and the
+request never waits on the SMS provider. ``bookings.outbox`` sends them.
+"""
+from .models import SmsOutbox
+
+
+def confirmation_message(booking):
+    return (
+        f"Parking Booking Confirmed\n"
+        f"Location: {booking.premise.name}\n"
+        f"Duration: {booking.duration} hours\n"
+        f"Total: INR {booking.total_price}\n"
+        f"Booking ID: {booking.id}\n"
+        f"Start Time: {booking.start_time.strftime('%Y-%m-%d %H:%M')}\n"
+        f"Thank you for using letsPark!"
+    )
+
+
+def queue_booking_confirmations(bookings):
+    """Add a confirmation SMS for each booking to the outbox."""
+    SmsOutbox.objects.bulk_create([
+        SmsOutbox(booking=booking, phone=booking.phone, body=confirmation_message(booking))
+        for booking in bookings
+    ])
@@ -0,0 +1,75 @@
+"""
+Delivery of queued ``SmsOutbox`` messages.
+
+Each batch is claimed by pushing its ``next_attempt_at`` forward by
+``LEASE`` in a short transaction, then sent outside any transaction. A
+worker that dies mid-batch therefore only delays its messages until the
+lease runs out, and several workers can drain the outbox side by side.
+Failed sends are retried with exponential backoff up to ``MAX_ATTEMPTS``.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SmsOutbox
+from .sms import SmsError, get_sms_provider
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``: 30s, 60s, 120s, ... capped at an hour, with jitter."""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(batch_size, now=None):
+    now = now or timezone.now()
+    with transaction.atomic():
+        queryset = SmsOutbox.objects.filter(status='pending', next_attempt_at__lte=now).order_by('next_attempt_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        batch = list(queryset[:batch_size])
+        if batch:
+            SmsOutbox.objects.filter(id__in=[message.id for message in batch]).update(next_attempt_at=now + LEASE)
+    return batch
+
+
+def drain_outbox(batch_size=50, provider=None):
+    """
+    Send one batch of due messages. Returns ``(sent, failed)``; ``(0, 0)``
+    means nothing was due.
+    """
+    provider = provider or get_sms_provider()
+    batch = claim_batch(batch_size)
+    sent = failed = 0
+    for message in batch:
+        message.attempts += 1
+        try:
+            provider.send(message.phone, message.body)
+        except Exception as e:
+            failed += 1
+            retryable = e.retryable if isinstance(e, SmsError) else True
+            message.last_error = str(e)[:1000]
+            if retryable and message.attempts < MAX_ATTEMPTS:
+                message.next_attempt_at = timezone.now() + backoff(message.attempts)
+            else:
+                message.status = 'failed'
+                logger.warning("Giving up on SMS %s to %s: %s", message.id, message.phone, e)
+        else:
+            sent += 1
+            message.status = 'sent'
+            message.sent_at = timezone.now()
+    if batch:
+        SmsOutbox.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return sent, failed
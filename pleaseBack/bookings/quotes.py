@@ -0,0 +1,100 @@
+"""
+Booking quotes: end time and price from a premise's hourly rate.
+
+Rates come from ``Premise.price_per_hour``/``price_currency`` and the
+unrounded ``price_amount`` per ``price_unit`` (parsed from the free text
+price when the premise is saved) and are kept in a
+per-process rate table filled on demand; ``bookings.models`` drops a
+premise's entry when the premise is saved or deleted in this process, and
+entries expire after ``RATE_TTL_SECONDS`` so edits made by other processes
+show up too. Quoting therefore costs no writes, no string parsing and,
+once warm, no queries.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from premises.models import Premise
+from premises.pricing import total_price
+
+Quote = namedtuple('Quote', ['end_time', 'total_price'])
+Rate = namedtuple('Rate', ['per_hour', 'currency', 'amount', 'unit'])
+
+# Premise columns a ``Rate`` is read from, in field order.
+RATE_FIELDS = ('price_per_hour', 'price_currency', 'price_amount', 'price_unit')
+
+RATE_TTL_SECONDS = 30
+
+# premise_id -> (expires_at, Rate)
+_rates = {}
+_rates_lock = threading.Lock()
+# Bumped by every ``forget_rate``, so a read that overlapped one is not cached.
+_generation = 0
+
+
+def rates_for(premise_ids):
+    """``{premise_id: Rate}`` for the given ids; unknown premises are left out."""
+    found = {}
+    missing = []
+    now = time.monotonic()
+    for premise_id in premise_ids:
+        entry = _rates.get(premise_id)
+        if entry is None or entry[0] <= now:
+            missing.append(premise_id)
+        else:
+            found[premise_id] = entry[1]
+    if missing:
+        generation = _generation
+        loaded = {
+            premise_id: Rate(*fields)
+            for premise_id, *fields in (
+                Premise.objects
+                .filter(pk__in=missing)
+                .values_list('id', *RATE_FIELDS)
+            )
+        }
+        with _rates_lock:
+            # A premise saved while we were reading may already have been
+            # forgotten; caching what we read could bring its old rate back.
+            if _generation == generation:
+                expires = now + RATE_TTL_SECONDS
+                _rates.update((premise_id, (expires, rate)) for premise_id, rate in loaded.items())
+        found.update(loaded)
+    return found
+
+
+def remember_rate(premise):
+    """Seed the table from a premise the caller already loaded."""
+    rate = Rate(*(getattr(premise, field) for field in RATE_FIELDS))
+    with _rates_lock:
+        _rates[premise.pk] = (time.monotonic() + RATE_TTL_SECONDS, rate)
+
+
+def forget_rate(premise_id):
+    global _generation
+    with _rates_lock:
+        _generation += 1
+        _rates.pop(premise_id, None)
+
+
+def price_for(rate, duration):
+    """Total for ``duration`` hours at ``rate``; 0 when the price could not be parsed."""
+    if rate is None or rate.amount is None:
+        return 0
+    return total_price(rate.amount, rate.unit, duration)
+
+
+def total_fits(total):
+    """Whether ``total`` fits ``Booking.total_price``; saving a larger one fails."""
+    from .models import Booking
+
+    field = Booking._meta.get_field('total_price')
+    return abs(total) < 10 ** (field.max_digits - field.decimal_places)
+
+
+def quote(premise_id, start_time, duration):
+    return Quote(
+        end_time=start_time + timedelta(hours=duration),
+        total_price=price_for(rates_for([premise_id]).get(premise_id), duration),
+    )
@@ -0,0 +1,190 @@
+"""
+Hourly occupancy rollups per premise (``OccupancyRollup``).
+
+A confirmed or completed booking adds the seconds it occupies a slot to
+every hour it overlaps, and its revenue and a booking count to its start
+hour; a cancelled one adds only a cancellation to its start hour. Every
+change is applied as signed deltas with one
+``INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x`` (same syntax
+on SQLite and PostgreSQL), in the transaction that changes the bookings:
+
+* ``Booking.save()`` diffs the booking against how it was loaded;
+* the batch create and the set-based transitions in ``inventory`` call
+  ``record_created`` / ``record_status_change`` directly.
+
+Rows whose counters all drop back to 0 are deleted. Deleting a premise
+deletes its rollups with it, so its bookings' deletes add no deltas.
+
+``python manage.py rebuild_occupancy_rollups`` recomputes them from the
+bookings table while bookings keep coming in.
+"""
+from contextlib import contextmanager
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, connection, transaction
+
+from .models import Booking, OccupancyRollup
+
+HOUR = timedelta(hours=1)
+BOOKED_STATUSES = ('confirmed', 'completed')
+# booked_seconds, revenue, bookings, cancellations
+COLUMNS = ('booked_seconds', 'revenue', 'bookings', 'cancellations')
+# Revenue only ever comes with a booking, so these say whether a row is empty
+# (without comparing a decimal SQLite may have summed as a float).
+COUNTERS = ('booked_seconds', 'bookings', 'cancellations')
+UPSERT_BATCH = 500
+
+# Booking fields the rollup depends on, in the order ``contributions`` takes them.
+STATE_FIELDS = Booking.ROLLUP_FIELDS
+
+
+def _hour(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _add(deltas, key, values):
+    current = deltas.get(key)
+    deltas[key] = values if current is None else [a + b for a, b in zip(current, values)]
+
+
+def contributions(premise_id, start_time, end_time, total_price, status, sign=1, into=None):
+    """Add one booking's signed contribution to ``into`` (``{(premise_id, hour): [...]}``)."""
+    deltas = {} if into is None else into
+    if status == 'cancelled':
+        _add(deltas, (premise_id, _hour(start_time)), [0, 0, 0, sign])
+    elif status in BOOKED_STATUSES:
+        bucket = _hour(start_time)
+        _add(deltas, (premise_id, bucket), [0, sign * total_price, sign, 0])
+        while bucket < end_time:
+            following = bucket + HOUR
+            seconds = (min(end_time, following) - max(start_time, bucket)).total_seconds()
+            _add(deltas, (premise_id, bucket), [sign * round(seconds), 0, 0, 0])
+            bucket = following
+    return deltas
+
+
+def apply(deltas):
+    """
+    Add ``deltas`` to the rollup table. The upsert returns the new counts,
+    so rows it left empty are deleted by id, and only when there are some.
+    """
+    items = [(key, values) for key, values in deltas.items() if any(values)]
+    if not items:
+        return
+    table = connection.ops.quote_name(OccupancyRollup._meta.db_table)
+    updates = ', '.join(f"{column} = {table}.{column} + excluded.{column}" for column in COLUMNS)
+    ops = connection.ops
+    emptied = []
+    with connection.cursor() as cursor:
+        for offset in range(0, len(items), UPSERT_BATCH):
+            batch = items[offset:offset + UPSERT_BATCH]
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch))
+            params = []
+            for (premise_id, hour), (seconds, revenue, bookings, cancellations) in batch:
+                params += [
+                    premise_id, ops.adapt_datetimefield_value(hour), seconds,
+                    ops.adapt_decimalfield_value(revenue, 12, 2), bookings, cancellations,
+                ]
+            cursor.execute(
+                f"INSERT INTO {table} (premise_id, hour, {', '.join(COLUMNS)}) "
+                f"VALUES {placeholders} "
+                f"ON CONFLICT (premise_id, hour) DO UPDATE SET {updates} "
+                f"RETURNING id, {', '.join(COUNTERS)}",
+                params,
+            )
+            emptied += [row[0] for row in cursor.fetchall() if not any(row[1:])]
+    if emptied:
+        OccupancyRollup.objects.filter(pk__in=emptied).delete()
+
+
+def record_change(before, after):
+    """Apply the change between two ``STATE_FIELDS`` tuples (None for "did not exist")."""
+    deltas = {}
+    if before is not None:
+        contributions(*before, sign=-1, into=deltas)
+    if after is not None:
+        contributions(*after, sign=1, into=deltas)
+    apply(deltas)
+
+
+def record_created(bookings):
+    """For bookings inserted without ``save()`` (``bulk_create``)."""
+    deltas = {}
+    for booking in bookings:
+        booking._rollup_state = tuple(getattr(booking, field) for field in STATE_FIELDS)
+        contributions(*booking._rollup_state, into=deltas)
+    apply(deltas)
+
+
+def record_status_change(rows, status):
+    """``rows`` are dicts with ``STATE_FIELDS`` (old status) that moved to ``status``."""
+    deltas = {}
+    for row in rows:
+        state = [row[field] for field in STATE_FIELDS]
+        contributions(*state, sign=-1, into=deltas)
+        contributions(*state[:-1], status, into=deltas)
+    apply(deltas)
+
+
+@contextmanager
+def _snapshot():
+    """
+    A transaction in which every read sees the same snapshot: REPEATABLE
+    READ on PostgreSQL (when outermost), as any read transaction on SQLite.
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def rebuild(premise_ids=None, chunk_size=2000):
+    """
+    Recompute the rollups from the bookings table, one premise at a time,
+    reading its bookings ``chunk_size`` rows at a time by id. Returns the
+    number of bookings read.
+
+    The premise's rollup rows and bookings are read in one snapshot, and
+    the difference is applied with the same additive upsert as every other
+    change, so nothing is locked and concurrent bookings are counted once:
+    a booking committed before the snapshot is in both the rows and the
+    recount, one committed after it in neither and adds its own delta.
+    Run it outside a transaction.
+    """
+    from premises.models import Premise
+
+    if premise_ids is None:
+        premise_ids = Premise.objects.order_by('id').values_list('id', flat=True)
+    read = 0
+    for premise_id in premise_ids:
+        deltas = {}
+        with _snapshot():
+            if not Premise.objects.filter(pk=premise_id).exists():
+                continue
+            for hour, *values in (
+                OccupancyRollup.objects.filter(premise_id=premise_id).values_list('hour', *COLUMNS)
+            ):
+                _add(deltas, (premise_id, hour), [-value for value in values])
+            last_id = 0
+            while True:
+                rows = list(
+                    Booking.objects
+                    .filter(premise_id=premise_id, id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', *STATE_FIELDS)[:chunk_size]
+                )
+                if not rows:
+                    break
+                for _, *state in rows:
+                    contributions(*state, into=deltas)
+                read += len(rows)
+                last_id = rows[-1][0]
+        try:
+            with transaction.atomic():
+                apply(deltas)
+        except IntegrityError:
+            # The premise was deleted meanwhile, and its rollups with it.
+            pass
+    return read
@@ -2,9 +2,24 @@ from rest_framework import serializers
 from .models import Booking
 from premises.serializers import PremiseSerializer
 from premises.models import Premise
+from django.utils import timezone
 from django.utils.timezone import localtime
+from backend.fieldsets import SparseFieldsetMixin
 
-class BookingSerializer(serializers.ModelSerializer):
+# How far ahead a booking may start.
+MAX_ADVANCE = timezone.timedelta(days=90)
+# Tolerated clock skew for a start time just in the past.
+START_TIME_LEEWAY = timezone.timedelta(minutes=5)
+# Longest booking, in hours.
+MAX_DURATION_HOURS = 24
+
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    ``premise`` is nested by default. Pass ``expand_premise=False`` to
+    return only the premise id (list views do unless ``?expand=premise``).
+
+    ``start_time`` is optional on create; omitted means "now".
+    """
     premise = PremiseSerializer(read_only=True)
     premise_id = serializers.PrimaryKeyRelatedField(
         queryset=Premise.objects.all(),
@@ -26,10 +41,39 @@ class BookingSerializer(serializers.ModelSerializer):
             'start_time', 'end_time', 'total_price', 'status', 'booking_time'
         ]
         read_only_fields = [
-            'premise', 'start_time', 'end_time', 
+            'premise', 'end_time', 
             'total_price', 'status', 'booking_time',
             'display_date', 'display_time_range', 'display_duration'
         ]
+        extra_kwargs = {'start_time': {'required': False}}
+
+    field_sources = {
+        'display_date': ('start_time',),
+        'display_time_range': ('start_time', 'end_time'),
+        'display_duration': ('duration',),
+    }
+
+    def __init__(self, *args, expand_premise=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not expand_premise and 'premise' in self.fields:
+            self.fields['premise'] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    def validate_start_time(self, value):
+        now = timezone.now()
+        if value < now - START_TIME_LEEWAY:
+            raise serializers.ValidationError("Start time cannot be in the past.")
+        if value > now + MAX_ADVANCE:
+            raise serializers.ValidationError(
+                f"Bookings can be made at most {MAX_ADVANCE.days} days ahead."
+            )
+        return value
+
+    def validate_duration(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Duration must be at least one hour.")
+        if value > MAX_DURATION_HOURS:
+            raise serializers.ValidationError(f"Duration can be at most {MAX_DURATION_HOURS} hours.")
+        return value
 
     def get_display_date(self, obj):
         return localtime(obj.start_time).strftime('%Y-%m-%d')
@@ -47,4 +91,108 @@ class BookingSerializer(serializers.ModelSerializer):
         return Booking.objects.create(**validated_data)
     
     def get_booking_time(self, obj):
-        return localtime(obj.booking_time).strftime('%Y-%m-%d %H:%M:%S')
\ No newline at end of file
+        return localtime(obj.booking_time).strftime('%Y-%m-%d %H:%M:%S')
+
+class BookingBatchItemSerializer(BookingSerializer):
+    """
+    One item of a batch create. ``premise_id`` is validated as a plain id
+    so a batch resolves its premises with a single query.
+    """
+    premise_id = serializers.IntegerField(write_only=True, min_value=1)
+
+
+class QuoteSerializer(serializers.Serializer):
+    """Input (``premise_id``, ``duration``) and output of ``/api/bookings/quote/``."""
+    premise_id = serializers.IntegerField(min_value=1)
+    duration = serializers.IntegerField(min_value=1, max_value=MAX_DURATION_HOURS)
+    hourly_rate = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, allow_null=True)
+    currency = serializers.CharField(read_only=True, allow_blank=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+
+class BookingRowSerializer:
+    """
+    Read-only fast path producing the same JSON as ``BookingSerializer``
+    from ``.values()`` rows, for long booking lists.
+
+    Each row's datetimes are converted to local time once and every
+    display field is derived from that. With ``expand_premise`` the page's
+    premises are loaded with one query and each is serialized once, however
+    many bookings point at it.
+    """
+    # Output field -> columns it reads, in BookingSerializer's field order.
+    columns = {
+        'id': ('id',),
+        'premise': ('premise_id',),
+        'name': ('name',),
+        'phone': ('phone',),
+        'duration': ('duration',),
+        'display_date': ('start_time',),
+        'display_time_range': ('start_time', 'end_time'),
+        'display_duration': ('duration',),
+        'start_time': ('start_time',),
+        'end_time': ('end_time',),
+        'total_price': ('total_price',),
+        'status': ('status',),
+        'booking_time': ('booking_time',),
+    }
+
+    def __init__(self, fields=None, expand_premise=False, context=None):
+        self.fields = [name for name in self.columns if fields is None or name in fields]
+        self.expand_premise = expand_premise
+        self.context = context or {}
+        self._price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def value_fields(self):
+        return sorted({column for name in self.fields for column in self.columns[name]})
+
+    def _premises(self, rows):
+        if 'premise' not in self.fields:
+            return {}
+        ids = {row['premise_id'] for row in rows}
+        if not self.expand_premise:
+            return {pk: pk for pk in ids}
+        premises = Premise.objects.in_bulk(ids).values()
+        data = PremiseSerializer(premises, many=True, context=self.context).data
+        return {item['id']: item for item in data}
+
+    def _renderers(self, premises, tz):
+        """One ``(name, render(row, start, end))`` per output field."""
+        price = self._price.to_representation
+        special = {
+            'premise': lambda row, start, end: premises[row['premise_id']],
+            'display_date': lambda row, start, end: start.strftime('%Y-%m-%d'),
+            'display_time_range': lambda row, start, end: f"{start:%H:%M} - {end:%H:%M}",
+            'display_duration': lambda row, start, end: (
+                f"{row['duration']} hour{'s' if row['duration'] != 1 else ''}"
+            ),
+            'start_time': lambda row, start, end: _isoformat(start),
+            'end_time': lambda row, start, end: _isoformat(end),
+            'total_price': lambda row, start, end: price(row['total_price']),
+            'booking_time': lambda row, start, end: (
+                row['booking_time'].astimezone(tz).strftime('%Y-%m-%d %H:%M:%S')
+            ),
+        }
+        return [
+            (name, special.get(name) or (lambda row, start, end, name=name: row[name]))
+            for name in self.fields
+        ]
+
+    def render(self, rows):
+        tz = timezone.get_current_timezone()
+        renderers = self._renderers(self._premises(rows), tz)
+        rendered = []
+        for row in rows:
+            # Convert each datetime to local time once per row.
+            start = row['start_time'].astimezone(tz) if 'start_time' in row else None
+            end = row['end_time'].astimezone(tz) if 'end_time' in row else None
+            rendered.append({name: render(row, start, end) for name, render in renderers})
+        return rendered
+
+
+def _isoformat(value):
+    # Matches DRF's DateTimeField output for aware datetimes.
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
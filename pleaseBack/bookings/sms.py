@@ -0,0 +1,92 @@
+"""
+SMS providers.
+
+``settings.SMS_PROVIDER`` names the provider class; the outbox worker
+(``bookings.outbox``) builds one instance per process and reuses it, so
+the Twilio provider keeps a single pooled HTTP session for every message.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class SmsError(Exception):
+    """Sending failed. ``retryable`` is False when trying again cannot help."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LoggingSmsProvider:
+    """Logs instead of sending; the default while Twilio is disabled."""
+
+    def send(self, phone, body):
+        logger.info("SMS would be sent to %s: %s", phone, body)
+
+
+class TwilioSmsProvider:
+    def __init__(self):
+        from twilio.http.http_client import TwilioHttpClient
+        from twilio.rest import Client
+
+        if not all([settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, settings.TWILIO_PHONE_NUMBER]):
+            raise RuntimeError("TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN and TWILIO_PHONE_NUMBER must be set")
+        self.client = Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=TwilioHttpClient(pool_connections=True, timeout=10),
+        )
+
+    def send(self, phone, body):
+        from twilio.base.exceptions import TwilioException, TwilioRestException
+
+        try:
+            self.client.messages.create(
+                body=body,
+                from_=settings.TWILIO_PHONE_NUMBER,
+                to=f"+91{phone}",
+            )
+        except TwilioRestException as e:
+            # Throttling and server errors are worth retrying; anything else
+            # (bad number, unverified recipient) will fail the same way again.
+            raise SmsError(str(e), retryable=e.status == 429 or e.status >= 500) from e
+        except (TwilioException, OSError) as e:
+            raise SmsError(str(e)) from e
+
+
+class FakeSmsProvider:
+    """
+    In-memory provider for tests. Sent messages are appended to ``sent``;
+    numbers in ``failing`` raise a retryable ``SmsError``.
+    """
+    sent = []
+    failing = set()
+
+    def send(self, phone, body):
+        if phone in self.failing:
+            raise SmsError(f"Fake failure for {phone}")
+        self.sent.append((phone, body))
+
+    @classmethod
+    def reset(cls):
+        cls.sent.clear()
+        cls.failing.clear()
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_sms_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                path = getattr(settings, 'SMS_PROVIDER', 'bookings.sms.LoggingSmsProvider')
+                _provider = import_string(path)()
+    return _provider
@@ -1,3 +1,724 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from premises.models import Premise
+from . import quotes
+from .inventory import (
+    activate_started_bookings, complete_expired_bookings, finish_booking, purge_past_buckets, reserve_booking,
+)
+from .models import Booking, OccupancyRollup, SlotUsage, SmsOutbox
+from .outbox import MAX_ATTEMPTS, drain_outbox
+from .quotes import forget_rate, rates_for
+from . import rollups
+from .rollups import rebuild
+from .serializers import BookingRowSerializer, BookingSerializer
+from .sms import FakeSmsProvider
+from .timeline import SLOT_BUCKET, OccupancyTimeline, bucket_floor
+from .views import BookingExportView
+
+User = get_user_model()
+
+
+def make_premise(**kwargs):
+    defaults = dict(
+        name='Test Parking', location='Alkapuri, Vadodara', latitude=22.3, longitude=73.18,
+        price='₹20/hour', available=2, total=2,
+    )
+    defaults.update(kwargs)
+    return Premise.objects.create(**defaults)
+
+
+class SlotInventoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('driver', 'driver@example.com', 'pass12345')
+        self.premise = make_premise()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self):
+        return self.client.post('/api/bookings/bookings/', {
+            'premise_id': self.premise.pk, 'name': 'Driver', 'phone': '9876543210', 'duration': 2,
+        }, format='json')
+
+    def test_booking_takes_a_slot_and_rejects_overbooking(self):
+        self.assertEqual(self.book().status_code, 201)
+        self.assertEqual(self.book().status_code, 201)
+        response = self.book()
+        self.assertEqual(response.status_code, 409)
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 0)
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_cancel_releases_slot_once(self):
+        booking_id = self.book().data['id']
+        self.assertEqual(self.client.post(f'/api/bookings/bookings/{booking_id}/cancel/').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/bookings/bookings/{booking_id}/cancel/').status_code, 404)
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 2)
+        self.assertEqual(Booking.objects.get(pk=booking_id).status, 'cancelled')
+
+    def test_release_never_exceeds_total(self):
+        booking = Booking.objects.create(
+            user=self.user, premise=self.premise, name='Driver', phone='9876543210', duration=1,
+        )
+        self.assertTrue(finish_booking(booking.pk, self.user, 'completed'))
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, self.premise.total)
+
+
+class OccupancyTimelineTests(SimpleTestCase):
+    def test_peak_matches_brute_force(self):
+        base = datetime(2026, 1, 1)
+        hour = timedelta(hours=1)
+        intervals = [(base + a * hour, base + b * hour) for a, b in [(0, 4), (1, 3), (2, 6), (5, 7), (3, 4)]]
+        timeline = OccupancyTimeline(intervals)
+        for a in range(-1, 9):
+            for b in range(a + 1, 10):
+                start, end = base + a * hour, base + b * hour
+                expected = max(
+                    sum(s <= base + t * hour < e for s, e in intervals)
+                    for t in range(a, b)
+                )
+                self.assertEqual(timeline.peak(start, end), expected, (a, b))
+
+    def test_empty_timeline_is_free(self):
+        now = datetime(2026, 1, 1)
+        self.assertEqual(OccupancyTimeline([]).free_slots(3, now, now + timedelta(hours=1)), 3)
+
+
+class TimeWindowReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner', 'planner@example.com', 'pass12345')
+        self.premise = make_premise(available=1, total=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tomorrow = (timezone.now() + timedelta(days=1)).replace(microsecond=0)
+
+    def book(self, start, duration=2):
+        return self.client.post('/api/bookings/bookings/', {
+            'premise_id': self.premise.pk, 'name': 'Planner', 'phone': '9876543210',
+            'duration': duration, 'start_time': start.isoformat(),
+        }, format='json')
+
+    def test_future_booking_keeps_its_window_and_rejects_overlaps(self):
+        response = self.book(self.tomorrow)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.get(pk=response.data['id']).start_time, self.tomorrow)
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 1)
+
+        self.assertEqual(self.book(self.tomorrow + timedelta(hours=1)).status_code, 409)
+        self.assertEqual(self.book(self.tomorrow + timedelta(hours=2)).status_code, 201)
+
+        response = self.client.get('/api/bookings/availability/', {
+            'premise_id': self.premise.pk,
+            'start': (self.tomorrow - timedelta(hours=2)).isoformat(),
+            'end': self.tomorrow.isoformat(),
+        })
+        self.assertEqual(response.data['free_slots'], 1)
+
+    def test_immediate_booking_blocked_by_upcoming_window(self):
+        self.assertEqual(self.book(timezone.now() + timedelta(hours=1)).status_code, 201)
+        response = self.client.post('/api/bookings/bookings/', {
+            'premise_id': self.premise.pk, 'name': 'Planner', 'phone': '9876543210', 'duration': 2,
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+
+    def test_future_bookings_only_touch_their_buckets(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.book(self.tomorrow).status_code, 201)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('UPDATE "premises_premise"', sql)
+        self.assertNotIn('FOR UPDATE', sql)
+        first = bucket_floor(self.tomorrow)
+        self.assertEqual(
+            list(SlotUsage.objects.filter(booked=1).values_list('bucket', flat=True).order_by('bucket')),
+            [first + i * SLOT_BUCKET for i in range(24)],
+        )
+
+    def test_cancelling_frees_the_window(self):
+        booking_id = self.book(self.tomorrow).data['id']
+        self.assertTrue(finish_booking(booking_id, self.user, 'cancelled'))
+        self.assertFalse(SlotUsage.objects.filter(booked__gt=0).exists())
+        self.assertEqual(self.book(self.tomorrow + timedelta(minutes=30)).status_code, 201)
+
+    def test_past_buckets_are_purged(self):
+        self.book(self.tomorrow)
+        self.assertEqual(purge_past_buckets(now=self.tomorrow + timedelta(hours=1)), 12)
+        self.assertEqual(SlotUsage.objects.count(), 12)
+
+    def test_started_booking_takes_its_slot(self):
+        booking_id = self.book(self.tomorrow).data['id']
+        self.assertEqual(activate_started_bookings(now=self.tomorrow), 1)
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 0)
+        self.assertTrue(finish_booking(booking_id, self.user, 'completed'))
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 1)
+
+
+class BatchBookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('fleet', 'fleet@example.com', 'pass12345')
+        self.premise = make_premise(available=2, total=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_batch_reports_each_item(self):
+        item = {'premise_id': self.premise.pk, 'name': 'Fleet', 'phone': '9876543210', 'duration': 1}
+        response = self.client.post('/api/bookings/bookings/batch/', {'bookings': [
+            item, item, item, {**item, 'premise_id': 999999}, {**item, 'duration': 0},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['created', 'created', 'error', 'error', 'error'],
+        )
+        self.assertIn('premise_id', response.data['results'][3]['errors'])
+        self.assertIn('duration', response.data['results'][4]['errors'])
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Booking.objects.first().total_price, 20)
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 0)
+        self.assertEqual(SmsOutbox.objects.count(), 2)
+
+    def test_huge_durations_are_item_errors(self):
+        item = {'premise_id': self.premise.pk, 'name': 'Fleet', 'phone': '9876543210'}
+        response = self.client.post('/api/bookings/bookings/batch/', {'bookings': [
+            {**item, 'duration': 1000000000}, {**item, 'duration': 25}, {**item, 'duration': 24},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']], ['error', 'error', 'created'],
+        )
+        self.assertIn('duration', response.data['results'][0]['errors'])
+        response = self.client.post('/api/bookings/bookings/', {**item, 'duration': 1000000000}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_totals_too_large_to_store_are_item_errors(self):
+        pricey = make_premise(name='Pricey Parking', price='₹99,999,999/hour')
+        item = {'name': 'Fleet', 'phone': '9876543210', 'duration': 24}
+        response = self.client.post('/api/bookings/bookings/batch/', {'bookings': [
+            {**item, 'premise_id': pricey.pk}, {**item, 'premise_id': self.premise.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([result['status'] for result in response.data['results']], ['error', 'created'])
+        self.assertIn('premise_id', response.data['results'][0]['errors'])
+        pricey.refresh_from_db()
+        self.assertEqual(pricey.available, 2)
+        self.assertFalse(SlotUsage.objects.filter(premise=pricey).exclude(booked=0).exists())
+
+
+class BulkTransitionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('fleet', 'fleet@example.com', 'pass12345')
+        self.premise = make_premise(available=3, total=3)
+        self.other = make_premise(name='Other Parking', available=3, total=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        item = {'name': 'Fleet', 'phone': '9876543210', 'duration': 1}
+        response = self.client.post('/api/bookings/bookings/batch/', {'bookings': [
+            {**item, 'premise_id': self.premise.pk}, {**item, 'premise_id': self.premise.pk},
+            {**item, 'premise_id': self.other.pk},
+        ]}, format='json')
+        self.ids = [result['booking']['id'] for result in response.data['results']]
+
+    def test_bulk_cancel_by_ids_releases_per_premise(self):
+        # Savepoint, select, status update, one bucket release and one
+        # counter release per premise, one rollup upsert, one delete of the
+        # hours the cancelled bookings alone occupied, release savepoint.
+        with self.assertNumQueries(10):
+            response = self.client.post('/api/bookings/bookings/bulk-cancel/', {
+                'booking_ids': self.ids + [999999],
+            }, format='json')
+        self.assertEqual(response.data['updated'], 3)
+        self.assertEqual(response.data['skipped'], [999999])
+        self.premise.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.premise.available, self.other.available), (3, 3))
+
+    def test_bulk_complete_by_premise(self):
+        response = self.client.post('/api/bookings/bookings/bulk-complete/', {
+            'premise_id': self.premise.pk,
+        }, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(Booking.objects.filter(status='completed').count(), 2)
+        self.assertEqual(Booking.objects.get(pk=self.ids[2]).status, 'confirmed')
+
+
+class ExpiredBookingSweepTests(TestCase):
+    def test_sweep_completes_expired_bookings_in_batches(self):
+        user = User.objects.create_user('sweeper', 'sweeper@example.com', 'pass12345')
+        premise = make_premise(available=5, total=5)
+        other = make_premise(name='Other Parking', available=5, total=5)
+        now = timezone.now()
+        for target, held in [(premise, True), (premise, True), (other, True), (other, False), (premise, True)]:
+            Booking.objects.create(user=user, premise=target, name='Sweeper', phone='9876543210',
+                                   duration=1, start_time=now - timedelta(hours=3), slot_held=held)
+        Booking.objects.create(user=user, premise=premise, name='Sweeper', phone='9876543210',
+                               duration=5, start_time=now - timedelta(hours=1))
+        Premise.objects.filter(pk=premise.pk).update(available=1)
+        Premise.objects.filter(pk=other.pk).update(available=4)
+
+        self.assertEqual(complete_expired_bookings(now=now, batch_size=2), 5)
+        self.assertEqual(complete_expired_bookings(now=now), 0)
+        premise.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((premise.available, other.available), (4, 5))
+        self.assertEqual(Booking.objects.filter(status='confirmed').count(), 1)
+
+
+class BookingRowSerializerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', 'reader@example.com', 'pass12345')
+        premises = [make_premise(available=5, total=5), make_premise(name='Other', price='₹35/hr', available=5, total=5)]
+        for hours, premise in zip([1, 2, 3], premises + premises[:1]):
+            Booking.objects.create(user=self.user, premise=premise, name='Reader',
+                                   phone='9876543210', duration=hours)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertMatchesModelSerializer(self, fields=None, expand_premise=False):
+        bookings = Booking.objects.order_by('id')
+        expected = BookingSerializer(bookings, many=True, fields=fields, expand_premise=expand_premise).data
+        rows = BookingRowSerializer(fields=fields, expand_premise=expand_premise)
+        actual = rows.render(list(bookings.values(*rows.value_fields())))
+        self.assertEqual(actual, [dict(item) for item in expected])
+
+    def test_rows_match_model_serializer(self):
+        self.assertMatchesModelSerializer()
+        self.assertMatchesModelSerializer(expand_premise=True)
+        self.assertMatchesModelSerializer(fields=['id', 'display_time_range', 'total_price'])
+
+    def test_list_view_dedupes_premises(self):
+        # One page of rows, one query for all of its premises.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/bookings/user-bookings/', {'expand': 'premise'})
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['premise']['name'], 'Test Parking')
+
+    def test_pages_break_start_time_ties_by_id(self):
+        Booking.objects.update(start_time=timezone.now())
+        seen = []
+        response = self.client.get('/api/bookings/user-bookings/', {'page_size': 1})
+        while True:
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, sorted(Booking.objects.values_list('id', flat=True), reverse=True))
+
+
+class BookingQuoteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('quoted', 'quoted@example.com', 'pass12345')
+        self.premise = make_premise()
+        booking = Booking.objects.create(user=self.user, premise=self.premise, name='Quoted',
+                                         phone='9876543210', duration=2)
+        self.booking_id = booking.pk
+
+    def test_status_change_does_not_requote(self):
+        booking = Booking.objects.get(pk=self.booking_id)
+        booking.status = 'cancelled'
+        # The status UPDATE, one rollup upsert, and one DELETE for the later
+        # hours that only this booking occupied (its start hour keeps the
+        # cancellation).
+        with self.assertNumQueries(3):
+            booking.save(update_fields=['status'])
+        # Nothing changed since: one UPDATE, no rollup delta.
+        with self.assertNumQueries(1):
+            booking.save()
+        self.assertEqual(Booking.objects.get(pk=self.booking_id).total_price, 40)
+
+    def test_duration_change_requotes(self):
+        booking = Booking.objects.get(pk=self.booking_id)
+        booking.duration = 3
+        booking.save(update_fields=['duration'])
+        booking = Booking.objects.get(pk=self.booking_id)
+        self.assertEqual(booking.total_price, 60)
+        self.assertEqual(booking.end_time - booking.start_time, timedelta(hours=3))
+
+    def test_moving_to_another_premise_requotes(self):
+        daily = make_premise(name='Daily Parking', price='₹24/day')
+        booking = Booking.objects.get(pk=self.booking_id)
+        booking.premise = daily
+        booking.save(update_fields=['premise'])
+        self.assertEqual(Booking.objects.get(pk=self.booking_id).total_price, 2)
+        booking = Booking.objects.get(pk=self.booking_id)
+        booking.premise = self.premise
+        booking.save()
+        self.assertEqual(Booking.objects.get(pk=self.booking_id).total_price, 40)
+
+    def test_premise_save_invalidates_cached_rate(self):
+        self.premise.price = '₹50/hour'
+        self.premise.save()
+        booking = Booking.objects.create(user=self.user, premise=self.premise, name='Quoted',
+                                         phone='9876543210', duration=2)
+        self.assertEqual(booking.total_price, 100)
+
+    def test_cached_rates_expire(self):
+        rates_for([self.premise.pk])
+        # Changed by another process: no signal reaches this one.
+        Premise.objects.filter(pk=self.premise.pk).update(price_amount=50, price_per_hour=50)
+        self.assertEqual(rates_for([self.premise.pk])[self.premise.pk].amount, 20)
+        later = time.monotonic() + quotes.RATE_TTL_SECONDS + 1
+        with mock.patch('bookings.quotes.time.monotonic', return_value=later):
+            self.assertEqual(rates_for([self.premise.pk])[self.premise.pk].amount, 50)
+
+    def test_read_overlapping_a_save_is_not_cached(self):
+        forget_rate(self.premise.pk)
+        filter_premises = Premise.objects.filter
+
+        def save_during_read(*args, **kwargs):
+            forget_rate(self.premise.pk)
+            return filter_premises(*args, **kwargs)
+
+        with mock.patch.object(Premise.objects, 'filter', side_effect=save_during_read):
+            self.assertIn(self.premise.pk, rates_for([self.premise.pk]))
+        self.assertNotIn(self.premise.pk, quotes._rates)
+
+
+class QuoteEndpointTests(TestCase):
+    def setUp(self):
+        self.premise = make_premise()
+        self.other = make_premise(name='Other Parking', price='₹480/day')
+        self.client = APIClient()
+
+    def test_quote_is_side_effect_free_and_cached(self):
+        self.client.get('/api/bookings/quote/', {'premise_id': self.premise.pk, 'duration': 1})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/bookings/quote/', {'premise_id': self.premise.pk, 'duration': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_price'], '60.00')
+        self.assertEqual(response.data['hourly_rate'], '20.00')
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_quote_list(self):
+        response = self.client.post('/api/bookings/quote/', {'items': [
+            {'premise_id': self.premise.pk, 'duration': 2},
+            {'premise_id': self.other.pk, 'duration': 2},
+            {'premise_id': 999999, 'duration': 2},
+        ]}, format='json')
+        quotes = response.data['quotes']
+        self.assertEqual([quote.get('total_price') for quote in quotes], ['40.00', '40.00', None])
+        self.assertIn('error', quotes[2])
+
+    def test_daily_price_is_not_rounded_per_hour(self):
+        daily = make_premise(name='Daily Parking', price='₹25/day')
+        response = self.client.get('/api/bookings/quote/', {'premise_id': daily.pk, 'duration': 24})
+        self.assertEqual(response.data['hourly_rate'], '1.04')
+        self.assertEqual(response.data['total_price'], '25.00')
+
+    def test_invalid_duration(self):
+        response = self.client.get('/api/bookings/quote/', {'premise_id': self.premise.pk, 'duration': 0})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/bookings/quote/', {'premise_id': self.premise.pk, 'duration': 1000000000})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('duration', response.data)
+
+    def test_totals_too_large_to_quote(self):
+        pricey = make_premise(name='Pricey Parking', price='₹99,999,999/hour')
+        response = self.client.get('/api/bookings/quote/', {'premise_id': pricey.pk, 'duration': 24})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('premise_id', response.data)
+        response = self.client.post('/api/bookings/quote/', {'items': [
+            {'premise_id': pricey.pk, 'duration': 24}, {'premise_id': self.premise.pk, 'duration': 24},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('error', response.data['quotes'][0])
+        self.assertEqual(response.data['quotes'][1]['total_price'], '480.00')
+
+    def test_bookings_too_large_to_price_are_rejected_before_reserving(self):
+        pricey = make_premise(name='Pricey Parking', price='₹99,999,999/hour', available=5, total=5)
+        self.client.force_authenticate(User.objects.create_user('big', 'big@example.com', 'pass12345'))
+        response = self.client.post('/api/bookings/bookings/', {
+            'premise_id': pricey.pk, 'name': 'Big', 'phone': '9876543210', 'duration': 24,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('premise_id', response.data)
+        self.assertFalse(Booking.objects.exists())
+        pricey.refresh_from_db()
+        self.assertEqual(pricey.available, 5)
+
+
+class BookingExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('exporter', 'exporter@example.com', 'pass12345')
+        premise = make_premise(available=5, total=5)
+        for hours in (1, 2, 3):
+            Booking.objects.create(user=self.user, premise=premise, name='Exporter',
+                                   phone='9876543210', duration=hours)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_csv_export_streams_rows(self):
+        response = self.client.get('/api/bookings/export/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'premise_id', 'premise_name'])
+        self.assertEqual(len(lines), 4)
+
+    def test_csv_cells_cannot_start_formulas(self):
+        Booking.objects.filter(duration=1).update(name='=HYPERLINK("http://evil.example")', phone='+919876543210')
+        response = self.client.get('/api/bookings/export/', {'status': 'confirmed'})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[1][3:5], ['\'=HYPERLINK("http://evil.example")', "'+919876543210"])
+        self.assertEqual(rows[2][3:5], ['Exporter', '9876543210'])
+
+    async def test_asgi_export_streams_chunks(self):
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.user)))()
+        with mock.patch.object(BookingExportView, 'EXPORT_CHUNK_SIZE', 2):
+            response = await self.async_client.get(
+                '/api/bookings/export/', headers={'Authorization': f'Bearer {token}'},
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        # Header, then one chunk per EXPORT_CHUNK_SIZE rows.
+        self.assertEqual([len(chunk.decode().splitlines()) for chunk in chunks], [1, 2, 1])
+
+    def test_ndjson_export_and_staff_only_all(self):
+        response = self.client.get('/api/bookings/export/', {'format': 'ndjson', 'status': 'confirmed'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['total_price'] for row in rows], ['20.00', '40.00', '60.00'])
+        self.assertEqual(self.client.get('/api/bookings/export/', {'all': 'true'}).status_code, 403)
+
+
+class OccupancyRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rolled', 'rolled@example.com', 'pass12345')
+        self.premise = make_premise(available=5, total=5)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = (timezone.now() + timedelta(days=2)).replace(hour=10, minute=30, second=0, microsecond=0)
+
+    def rollups(self):
+        return {
+            row.hour.hour: (row.booked_seconds, row.revenue, row.bookings, row.cancellations)
+            for row in OccupancyRollup.objects.filter(premise=self.premise)
+        }
+
+    def test_transitions_update_rollups_and_match_rebuild(self):
+        response = self.client.post('/api/bookings/bookings/batch/', {'bookings': [
+            {'premise_id': self.premise.pk, 'name': 'A', 'phone': '9876543210', 'duration': 2,
+             'start_time': self.start.isoformat()},
+            {'premise_id': self.premise.pk, 'name': 'B', 'phone': '9876543210', 'duration': 1,
+             'start_time': self.start.isoformat()},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.rollups(), {
+            10: (3600, 60, 2, 0), 11: (5400, 0, 0, 0), 12: (1800, 0, 0, 0),
+        })
+
+        first, second = Booking.objects.filter(premise=self.premise).order_by('id')
+        # Status, slot buckets and rollups; no re-reading of the booking,
+        # and no rollup row is left empty.
+        with self.assertNumQueries(6):
+            finish_booking(second.pk, self.user, 'cancelled')
+        finish_booking(first.pk, self.user, 'completed')
+        expected = {10: (1800, 40, 1, 1), 11: (3600, 0, 0, 0), 12: (1800, 0, 0, 0)}
+        self.assertEqual(self.rollups(), expected)
+
+        OccupancyRollup.objects.all().delete()
+        self.assertEqual(rebuild(chunk_size=1), 2)
+        self.assertEqual(self.rollups(), expected)
+
+    def test_rebuild_corrects_drift_and_keeps_concurrent_bookings(self):
+        Booking.objects.create(user=self.user, premise=self.premise, name='A',
+                               phone='9876543210', duration=2, start_time=self.start)
+        expected = self.rollups()
+        OccupancyRollup.objects.filter(premise=self.premise, hour__hour=11).update(bookings=5)
+        OccupancyRollup.objects.create(premise=self.premise, hour=self.start.replace(hour=20, minute=0),
+                                       booked_seconds=60)
+
+        # A booking committed after the rebuild's snapshot adds its own
+        # delta while the correction is applied; it must count once.
+        apply = rollups.apply
+        booked = []
+
+        def book_then_apply(deltas):
+            if not booked:
+                booked.append(True)
+                Booking.objects.create(user=self.user, premise=self.premise, name='B',
+                                       phone='9876543210', duration=1, start_time=self.start)
+            apply(deltas)
+
+        with mock.patch('bookings.rollups.apply', side_effect=book_then_apply):
+            self.assertEqual(rebuild(), 1)
+        expected[10] = (1800 + 1800, 40 + 20, 2, 0)
+        expected[11] = (3600 + 1800, 0, 0, 0)
+        self.assertEqual(self.rollups(), expected)
+
+        self.assertEqual(rebuild(), 2)
+        self.assertEqual(self.rollups(), expected)
+
+    def test_model_save_records_edits(self):
+        booking = Booking.objects.create(user=self.user, premise=self.premise, name='A',
+                                         phone='9876543210', duration=1, start_time=self.start)
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.duration = 2
+        booking.save(update_fields=['duration'])
+        self.assertEqual(self.rollups(), {10: (1800, 40, 1, 0), 11: (3600, 0, 0, 0), 12: (1800, 0, 0, 0)})
+        Booking.objects.filter(pk=booking.pk).delete()
+        self.assertEqual(self.rollups(), {})
+
+    def test_deleting_a_premise_with_bookings(self):
+        other = make_premise(name='Other Parking')
+        for premise in (self.premise, other):
+            Booking.objects.create(user=self.user, premise=premise, name='A',
+                                   phone='9876543210', duration=1, start_time=self.start)
+        Premise.objects.filter(pk=other.pk).delete()
+        self.premise.delete()
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(OccupancyRollup.objects.exists())
+
+    def test_staff_endpoint(self):
+        Booking.objects.create(user=self.user, premise=self.premise, name='A',
+                               phone='9876543210', duration=2, start_time=self.start)
+        params = {'premise_id': self.premise.pk, 'start': (self.start - timedelta(days=1)).isoformat(),
+                  'end': (self.start + timedelta(days=1)).isoformat(), 'bucket': 'day'}
+        self.assertEqual(self.client.get('/api/bookings/occupancy/', params).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/bookings/occupancy/', params)
+        self.assertEqual(response.status_code, 200)
+        [row] = response.data['rows']
+        self.assertEqual(row['booked_slot_hours'], 2)
+        self.assertEqual(row['occupancy'], round(2 / (5 * 24), 4))
+        self.assertEqual((row['revenue'], row['bookings']), (40, 1))
+        self.assertEqual(len(self.client.get('/api/bookings/occupancy/', {**params, 'bucket': 'hour'}).data['rows']), 3)
+
+
+class SmsOutboxTests(TestCase):
+    def setUp(self):
+        FakeSmsProvider.reset()
+        self.provider = FakeSmsProvider()
+        self.user = User.objects.create_user('texter', 'texter@example.com', 'pass12345')
+        self.premise = make_premise()
+
+    def book(self, phone='9876543210'):
+        return Booking.objects.create(
+            user=self.user, premise=self.premise, name='Texter', phone=phone, duration=1,
+        )
+
+    def test_booking_queues_confirmation_and_worker_sends_it(self):
+        booking = self.book()
+        message = SmsOutbox.objects.get()
+        self.assertEqual(message.booking, booking)
+        self.assertIn(f"Booking ID: {booking.id}", message.body)
+        self.assertEqual(FakeSmsProvider.sent, [])
+
+        self.assertEqual(drain_outbox(provider=self.provider), (1, 0))
+        self.assertEqual(FakeSmsProvider.sent, [('9876543210', message.body)])
+        self.assertEqual(SmsOutbox.objects.get().status, 'sent')
+        self.assertEqual(drain_outbox(provider=self.provider), (0, 0))
+
+    def test_failures_back_off_then_give_up(self):
+        FakeSmsProvider.failing.add('9999999999')
+        self.book(phone='9999999999')
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.assertEqual(drain_outbox(provider=self.provider), (0, 1))
+            message = SmsOutbox.objects.get()
+            self.assertEqual(message.attempts, attempt)
+            if message.status == 'pending':
+                self.assertGreater(message.next_attempt_at, timezone.now())
+                # Not due yet: the next drain must not touch it.
+                self.assertEqual(drain_outbox(provider=self.provider), (0, 0))
+                SmsOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(message.status, 'failed')
+
+
+class SlotInventoryConcurrencyTests(TransactionTestCase):
+    def test_parallel_reservations_never_overbook(self):
+        premise = make_premise(available=5, total=5)
+        results = []
+        start = threading.Barrier(20)
+
+        def worker():
+            committed = []
+            try:
+                start.wait()
+                while True:
+                    try:
+                        now = timezone.now()
+                        with transaction.atomic():
+                            # Registered first, so it still runs if a later
+                            # on_commit callback hits a lock.
+                            transaction.on_commit(lambda: committed.append(True))
+                            reserved, _ = reserve_booking(premise.pk, now, now + timedelta(hours=1))
+                    except OperationalError:
+                        # SQLite's shared-cache test database reports table
+                        # lock contention instead of waiting; back off and
+                        # retry like a client would.
+                        if not committed:
+                            time.sleep(random.uniform(0, 0.02))
+                            continue
+                    results.append(reserved)
+                    return
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        premise.refresh_from_db()
+        self.assertEqual(results.count(True), 5)
+        self.assertEqual(results.count(False), 15)
+        self.assertEqual(premise.available, 0)
+        self.assertEqual(max(SlotUsage.objects.values_list('booked', flat=True)), 5)
+
+    def test_parallel_window_reservations_never_overbook(self):
+        premise = make_premise(available=3, total=3)
+        tomorrow = timezone.now() + timedelta(days=1)
+        # Ten clients want overlapping windows, ten want a later, disjoint one.
+        windows = [(tomorrow + timedelta(minutes=10 * (i % 10)), timedelta(hours=2)) for i in range(10)]
+        windows += [(tomorrow + timedelta(hours=6), timedelta(hours=1))] * 10
+        results = [None] * len(windows)
+        start = threading.Barrier(len(windows))
+
+        def worker(index):
+            begin, length = windows[index]
+            try:
+                start.wait()
+                while True:
+                    try:
+                        with transaction.atomic():
+                            results[index] = reserve_booking(premise.pk, begin, begin + length)[0]
+                        return
+                    except OperationalError:
+                        continue
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(windows))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results[:10].count(True), 3)
+        self.assertEqual(results[10:].count(True), 3)
+        self.assertEqual(max(SlotUsage.objects.values_list('booked', flat=True)), 3)
+        premise.refresh_from_db()
+        self.assertEqual(premise.available, 3)
@@ -0,0 +1,139 @@
+"""
+Per-premise occupancy over time.
+
+Reservations are counted per premise in ``SLOT_BUCKET`` buckets
+(``SlotUsage`` rows, see ``bookings.inventory``); ``slot_buckets`` maps a
+booking window onto them.
+
+``OccupancyTimeline`` sweeps a set of ``[start, end)`` booking intervals
+into elementary segments with a constant occupancy and keeps a sparse
+table over them, so "how many slots are taken at the busiest moment
+between T1 and T2" costs two bisects and one O(1) range-max lookup.
+Timelines are built from bucket-aligned intervals so their answers agree
+with what reservations accept.
+
+Timelines for hot premises are kept in a small in-process LRU cache and
+dropped whenever one of the premise's bookings changes. The cache only
+serves reads; reservations go through the bucket rows.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+CACHE_SIZE = 256
+CACHE_TTL_SECONDS = 30
+
+SLOT_BUCKET = timedelta(minutes=5)
+_BUCKET_EPOCH = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def bucket_floor(moment):
+    """Start of the bucket containing ``moment``."""
+    return moment - (moment - _BUCKET_EPOCH) % SLOT_BUCKET
+
+
+def slot_buckets(start, end):
+    """
+    ``(first, last)``: a booking for ``[start, end)`` occupies the buckets
+    ``[first, last)``. Both ends snap down to the bucket grid, so
+    back-to-back bookings never share a bucket whatever minute they start
+    at (two bookings may overlap by less than one bucket).
+    """
+    first = bucket_floor(start)
+    return first, max(bucket_floor(end), first + SLOT_BUCKET)
+
+
+def bucket_starts(first, last):
+    starts = []
+    while first < last:
+        starts.append(first)
+        first += SLOT_BUCKET
+    return starts
+
+
+class OccupancyTimeline:
+    def __init__(self, intervals):
+        deltas = {}
+        for start, end in intervals:
+            if start >= end:
+                continue
+            deltas[start] = deltas.get(start, 0) + 1
+            deltas[end] = deltas.get(end, 0) - 1
+
+        # counts[i] is the occupancy of [times[i], times[i + 1]).
+        self.times = sorted(deltas)
+        counts = []
+        running = 0
+        for moment in self.times[:-1]:
+            running += deltas[moment]
+            counts.append(running)
+
+        self._table = [counts]
+        width = 1
+        while width * 2 <= len(counts):
+            previous = self._table[-1]
+            self._table.append([
+                max(previous[i], previous[i + width])
+                for i in range(len(counts) - 2 * width + 1)
+            ])
+            width *= 2
+
+    def peak(self, start, end):
+        """Highest number of overlapping intervals at any instant in ``[start, end)``."""
+        if start >= end or len(self.times) < 2:
+            return 0
+        first = max(bisect_right(self.times, start) - 1, 0)
+        last = min(bisect_left(self.times, end), len(self.times) - 1) - 1
+        if first > last:
+            return 0
+        level = (last - first + 1).bit_length() - 1
+        row = self._table[level]
+        return max(row[first], row[last - (1 << level) + 1])
+
+    def free_slots(self, total, start, end):
+        """Slots free for the whole of ``[start, end)`` out of ``total``."""
+        return max(total - self.peak(start, end), 0)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def build_timeline(premise_id, since=None):
+    """Timeline of the premise's confirmed bookings that end after ``since``."""
+    from .models import Booking
+
+    intervals = (
+        Booking.objects
+        .filter(premise_id=premise_id, status='confirmed', end_time__gt=since or timezone.now())
+        .values_list('start_time', 'end_time')
+    )
+    return OccupancyTimeline(slot_buckets(start, end) for start, end in intervals)
+
+
+def get_timeline(premise_id):
+    """Cached ``build_timeline(premise_id)``; entries live for ``CACHE_TTL_SECONDS``."""
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(premise_id)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(premise_id)
+            return entry[1]
+
+    timeline = build_timeline(premise_id)
+    with _cache_lock:
+        _cache[premise_id] = (now + CACHE_TTL_SECONDS, timeline)
+        _cache.move_to_end(premise_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return timeline
+
+
+def invalidate_timelines(premise_ids):
+    with _cache_lock:
+        for premise_id in premise_ids:
+            _cache.pop(premise_id, None)
@@ -1,9 +1,18 @@
 from django.urls import path
-from .views import BookingCreateView, BookingCancelView, UserBookingListView,BookingCompleteView
+from .views import BookingCreateView, BookingCancelView, UserBookingListView,BookingCompleteView, BookingAvailabilityView, BookingBatchCreateView
+from .views import BookingBulkCancelView, BookingBulkCompleteView, BookingQuoteView, BookingExportView
+from .views import OccupancyRollupView
 
 urlpatterns = [
     path('bookings/', BookingCreateView.as_view(), name='booking-create'),
+    path('bookings/batch/', BookingBatchCreateView.as_view(), name='booking-batch-create'),
+    path('bookings/bulk-cancel/', BookingBulkCancelView.as_view(), name='booking-bulk-cancel'),
+    path('bookings/bulk-complete/', BookingBulkCompleteView.as_view(), name='booking-bulk-complete'),
     path('bookings/<int:booking_id>/cancel/', BookingCancelView.as_view(), name='booking-cancel'),
     path('user-bookings/', UserBookingListView.as_view(), name='user-bookings'),
     path('bookings/<int:booking_id>/complete/', BookingCompleteView.as_view(), name='booking-complete'),
+    path('export/', BookingExportView.as_view(), name='booking-export'),
+    path('quote/', BookingQuoteView.as_view(), name='booking-quote'),
+    path('availability/', BookingAvailabilityView.as_view(), name='booking-availability'),
+    path('occupancy/', OccupancyRollupView.as_view(), name='booking-occupancy'),
 ]
\ No newline at end of file
@@ -1,30 +1,9 @@
-# utils/twilio_service.py
-from django.conf import settings
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
-import logging
+from .sms import get_sms_provider
 
-logger = logging.getLogger(__name__)
 
 def send_sms(phone, message):
-    # Twilio sending disabled to prevent errors due to lack of credits
-    logger.info(f"SMS would be sent to {phone}: {message}")
-    return
-    
-    # if not all([
-    #     getattr(settings, 'TWILIO_ACCOUNT_SID', None),
-    #     getattr(settings, 'TWILIO_AUTH_TOKEN', None),
-    #     getattr(settings, 'TWILIO_PHONE_NUMBER', None)
-    # ]):
-    #     return
-    # try:
-    #     client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-    #     client.messages.create(
-    #         body=message,
-    #         from_=settings.TWILIO_PHONE_NUMBER,
-    #         to=f"+91{phone}"
-    #     )
-    # except TwilioRestException:
-    #     pass
-    # except Exception:
-    #     pass
+    """
+    Send one SMS right away through ``settings.SMS_PROVIDER``. Booking
+    confirmations go through the outbox instead (``bookings.notifications``).
+    """
+    get_sms_provider().send(phone, message)
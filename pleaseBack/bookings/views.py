@@ -1,31 +1,76 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
-from .models import Booking
-from .serializers import BookingSerializer
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDay
+from .models import Booking, OccupancyRollup
+from .serializers import BookingBatchItemSerializer, BookingRowSerializer, BookingSerializer, QuoteSerializer
 from premises.models import Premise
-from rest_framework import status
-from .utils import send_sms
+from .inventory import finish_booking, finish_bookings, reserve_booking, reserve_many
+from .notifications import queue_booking_confirmations
+from .quotes import price_for, quote, rates_for, remember_rate, total_fits
+from .rollups import record_created
+from .timeline import get_timeline, slot_buckets
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.pagination import BookingCursorPagination
+from idempotency.decorators import idempotent
 import datetime
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import PermissionDenied
+from backend.renderers import CSVRenderer, NDJSONRenderer
+
+# Upper bound on items in one batch create or bulk transition request.
+MAX_BATCH_SIZE = 100
+NO_SLOTS_MESSAGE = "No slots available at this premise for the selected time"
+PREMISE_NOT_FOUND_MESSAGE = "Premise not found."
+PRICE_OUT_OF_RANGE_MESSAGE = "The total price at this premise's rate is too large."
+
 class BookingCreateView(generics.CreateAPIView):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent('bookings.create')
     def create(self, request, *args, **kwargs):
         try:
             serializer = self.get_serializer(data=request.data)
             serializer.is_valid(raise_exception=True)
             
-            # Create booking
-            # The post_save signal in models.py handles sending the SMS, 
-            # so we don't need to do it here manually.
-            booking = serializer.save(user=request.user)
+            data = serializer.validated_data
+            start_time = data.get('start_time') or timezone.now()
+            end_time = start_time + timezone.timedelta(hours=data['duration'])
+            if not total_fits(quote(data['premise'].pk, start_time, data['duration']).total_price):
+                raise ValidationError({'premise_id': PRICE_OUT_OF_RANGE_MESSAGE})
+
+            with transaction.atomic():
+                # Reserve first; rejects windows where the premise would be
+                # oversubscribed at any moment.
+                reserved, slot_held = reserve_booking(data['premise'].pk, start_time, end_time)
+                if not reserved:
+                    return Response(
+                        {"error": NO_SLOTS_MESSAGE},
+                        status=status.HTTP_409_CONFLICT
+                    )
+
+                # Create booking
+                # The post_save signal in models.py handles sending the SMS, 
+                # so we don't need to do it here manually.
+                booking = serializer.save(
+                    user=request.user, start_time=start_time, slot_held=slot_held
+                )
             
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        except ValidationError:
+            raise
         except Exception as e:
             # Log the full stack trace to console (visible in Render logs)
             import traceback
@@ -36,78 +81,290 @@ class BookingCreateView(generics.CreateAPIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-class UserBookingListView(generics.ListAPIView):
+class BookingBatchCreateView(APIView):
+    """
+    Create up to ``MAX_BATCH_SIZE`` bookings at once:
+    ``{"bookings": [{premise_id, name, phone, duration, start_time?}, ...]}``.
+
+    Items are validated and reserved independently in one transaction and
+    inserted with a single ``bulk_create``. The response lists each item's
+    outcome in request order; 201 if all were created, 207 otherwise.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        items = request.data.get('bookings') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'bookings': 'Expected a non-empty list of bookings.'})
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValidationError({'bookings': f'At most {MAX_BATCH_SIZE} bookings per request.'})
+
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = BookingBatchItemSerializer(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+        premises = Premise.objects.in_bulk({data['premise_id'] for _, data in valid})
+        for premise in premises.values():
+            remember_rate(premise)
+        now = timezone.now()
+        pending = []
+        windows = []
+        for index, data in valid:
+            start_time = data.get('start_time') or now
+            premise_id = data['premise_id']
+            if premise_id in premises and not total_fits(quote(premise_id, start_time, data['duration']).total_price):
+                results[index] = {'index': index, 'status': 'error',
+                                  'errors': {'premise_id': [PRICE_OUT_OF_RANGE_MESSAGE]}}
+                continue
+            pending.append((index, data))
+            windows.append((premise_id, start_time, start_time + timezone.timedelta(hours=data['duration'])))
+
+        created = []
+        with transaction.atomic():
+            outcomes = reserve_many(windows)
+            for (index, data), (premise_id, start_time, _), (reserved, slot_held) in zip(pending, windows, outcomes):
+                if premise_id not in premises:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'errors': {'premise_id': ['Premise not found.']}}
+                elif not reserved:
+                    results[index] = {'index': index, 'status': 'error',
+                                      'errors': {'non_field_errors': [NO_SLOTS_MESSAGE]}}
+                else:
+                    booking = Booking(
+                        user=request.user, premise=premises[premise_id],
+                        name=data['name'], phone=data['phone'], duration=data['duration'],
+                        start_time=start_time, slot_held=slot_held,
+                    )
+                    booking.apply_quote()
+                    created.append((index, booking))
+
+            Booking.objects.bulk_create([booking for _, booking in created])
+            record_created([booking for _, booking in created])
+            queue_booking_confirmations([booking for _, booking in created])
+
+        for index, booking in created:
+            results[index] = {
+                'index': index, 'status': 'created',
+                'booking': BookingSerializer(booking, expand_premise=False).data,
+            }
+        all_created = len(created) == len(items)
+        return Response(
+            {'created': len(created), 'failed': len(items) - len(created), 'results': results},
+            status=status.HTTP_201_CREATED if all_created else status.HTTP_207_MULTI_STATUS,
+        )
+
+class BookingQuoteView(APIView):
+    """
+    Price preview without creating anything, answered from the cached rate
+    table. ``GET ?premise_id=&duration=`` quotes one premise; ``POST
+    {"items": [{premise_id, duration}, ...]}`` quotes up to
+    ``MAX_BATCH_SIZE`` at once, with per-item errors for unknown premises.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        serializer = QuoteSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        quote = self._quotes([serializer.validated_data])[0]
+        if 'error' in quote:
+            raise ValidationError({'premise_id': quote['error']})
+        return Response(quote)
+
+    def post(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'items': 'Expected a non-empty list of {premise_id, duration}.'})
+        if len(items) > MAX_BATCH_SIZE:
+            raise ValidationError({'items': f'At most {MAX_BATCH_SIZE} quotes per request.'})
+        serializer = QuoteSerializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+        return Response({'quotes': self._quotes(serializer.validated_data)})
+
+    def _quotes(self, items):
+        rates = rates_for({item['premise_id'] for item in items})
+        quotes = []
+        for item in items:
+            rate = rates.get(item['premise_id'])
+            if rate is None:
+                quotes.append({**item, 'error': PREMISE_NOT_FOUND_MESSAGE})
+                continue
+            total = price_for(rate, item['duration'])
+            if not total_fits(total):
+                quotes.append({**item, 'error': PRICE_OUT_OF_RANGE_MESSAGE})
+                continue
+            quotes.append(QuoteSerializer({
+                **item,
+                'hourly_rate': rate.per_hour,
+                'currency': rate.currency,
+                'total_price': total,
+            }).data)
+        return quotes
+
+class UserBookingListView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    The user's bookings. ``premise`` is an id unless ``?expand=premise``;
+    ``?fields=`` limits the columns read and returned. Rendered by
+    ``BookingRowSerializer``; ``BookingSerializer`` defines the fields.
+    """
     serializer_class = BookingSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = BookingCursorPagination
+    always_fields = ('id', 'start_time')
+    expandable = ('premise',)
 
     def get_queryset(self):
         status_param = self.request.query_params.get('status', None)
-        queryset = Booking.objects.filter(user=self.request.user).select_related('premise')
-        
+        queryset = Booking.objects.filter(user=self.request.user)
         if status_param:
             queryset = queryset.filter(status=status_param.lower())
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Read-only fast path: page over .values() rows and render them
+        # with BookingRowSerializer instead of model instances.
+        rows = BookingRowSerializer(
+            fields=self.requested_fields,
+            expand_premise='premise' in self.expanded,
+            context=self.get_serializer_context(),
+        )
+        queryset = self.get_queryset().values(*rows.value_fields(), *self.always_fields)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(rows.render(page))
+
+class BookingExportView(APIView):
+    """
+    Stream the user's booking history as ``?format=csv`` (default) or
+    ``?format=ndjson``. Staff may pass ``?all=true`` to export every
+    booking. Rows are read ``EXPORT_CHUNK_SIZE`` at a time from a
+    ``.values_list().iterator()``, so memory stays flat however long the
+    history is. Optional ``?status=`` filter.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+    columns = (
+        'id', 'premise_id', 'premise__name', 'name', 'phone', 'duration',
+        'start_time', 'end_time', 'total_price', 'status', 'booking_time',
+    )
+    EXPORT_CHUNK_SIZE = 2000
+
+    def get(self, request):
+        queryset = Booking.objects.all()
+        columns = self.columns
+        if request.query_params.get('all') == 'true':
+            if not request.user.is_staff:
+                raise PermissionDenied("Only staff can export all bookings.")
+            columns = (*columns, 'user__email')
+        else:
+            queryset = queryset.filter(user=request.user)
+        status_param = request.query_params.get('status')
+        if status_param:
+            queryset = queryset.filter(status=status_param.lower())
+        queryset = queryset.order_by('id').values_list(*columns)
+
+        renderer = request.accepted_renderer
+        header = [column.replace('__', '_') for column in columns]
+        if isinstance(request._request, ASGIRequest):
+            content = self._stream_async(renderer, header, queryset)
+        else:
+            content = self._stream(renderer, header, queryset)
+        response = StreamingHttpResponse(content, content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="bookings.{renderer.format}"'
+        return response
+
+    def _chunks(self, queryset):
+        rows = queryset.iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        while chunk := list(islice(rows, self.EXPORT_CHUNK_SIZE)):
+            yield chunk
+
+    def _stream(self, renderer, header, queryset):
+        yield renderer.header(header)
+        for chunk in self._chunks(queryset):
+            yield renderer.rows(header, chunk)
+
+    async def _stream_async(self, renderer, header, queryset):
+        # Under ASGI Django would buffer a sync iterator completely; pull
+        # each chunk through sync_to_async instead (always the same thread,
+        # so the database cursor stays usable between chunks).
+        chunks = self._chunks(queryset)
+        next_chunk = sync_to_async(lambda: next(chunks, None))
+        yield renderer.header(header)
+        while (chunk := await next_chunk()) is not None:
+            yield renderer.rows(header, chunk)
+
 class BookingCancelView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
     def post(self, request, booking_id):
-        try:
-            booking = Booking.objects.select_related('premise').get(
-                id=booking_id, 
-                user=request.user,
-                status='confirmed'  # Only allow cancelling active bookings
-            )
-            
-            # Increment available slots
-            booking.premise.available += 1
-            booking.premise.save()
-            
-            booking.status = 'cancelled'
-            booking.save()
-
-            return Response(
-                {'status': 'Booking cancelled successfully'}, 
-                status=status.HTTP_200_OK
-            )
-            
-        except Booking.DoesNotExist:
+        # Only allow cancelling active bookings
+        if not finish_booking(booking_id, request.user, 'cancelled'):
             return Response(
                 {'error': 'Booking not found or not eligible for cancellation'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(
+            {'status': 'Booking cancelled successfully'}, 
+            status=status.HTTP_200_OK
+        )
 
 class BookingCompleteView(APIView):
     permission_classes = [IsAuthenticated]
 
-    @transaction.atomic
     def post(self, request, booking_id):
-        try:
-            booking = Booking.objects.select_related('premise').get(
-                id=booking_id,
-                user=request.user,
-                status='confirmed'  # Only allow completing active bookings
-            )
-            
-            # Update premise available slots
-            booking.premise.available += 1
-            booking.premise.save()
-            
-            # Mark booking as completed
-            booking.status = 'completed'
-            booking.save()
-            
-            return Response(
-                {'status': 'Booking completed successfully'},
-                status=status.HTTP_200_OK
-            )
-            
-        except Booking.DoesNotExist:
+        # Only allow completing active bookings
+        if not finish_booking(booking_id, request.user, 'completed'):
             return Response(
                 {'error': 'Booking not found or not eligible for completion'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(
+            {'status': 'Booking completed successfully'},
+            status=status.HTTP_200_OK
+        )
+
+class BookingBulkTransitionView(APIView):
+    """
+    Move several of the user's confirmed bookings to ``target_status``:
+    ``{"booking_ids": [...]}`` and/or ``{"premise_id": <id>}`` (all of them
+    at that premise). Ids that are not the user's confirmed bookings are
+    reported back in ``skipped``.
+    """
+    permission_classes = [IsAuthenticated]
+    target_status = None
+
+    def post(self, request):
+        data = request.data if isinstance(request.data, dict) else {}
+        booking_ids = data.get('booking_ids')
+        premise_id = data.get('premise_id')
+        if booking_ids is None and premise_id is None:
+            raise ValidationError({'booking_ids': 'Provide booking_ids and/or premise_id.'})
+        if booking_ids is not None:
+            if (not isinstance(booking_ids, list) or len(booking_ids) > MAX_BATCH_SIZE
+                    or not all(isinstance(i, int) and not isinstance(i, bool) for i in booking_ids)):
+                raise ValidationError({'booking_ids': f'Expected a list of at most {MAX_BATCH_SIZE} ids.'})
+        if premise_id is not None and (not isinstance(premise_id, int) or isinstance(premise_id, bool)):
+            raise ValidationError({'premise_id': 'Expected a premise id.'})
+
+        finished = finish_bookings(
+            request.user, self.target_status, booking_ids=booking_ids, premise_id=premise_id
+        )
+        finished_set = set(finished)
+        return Response({
+            'status': self.target_status,
+            'updated': len(finished),
+            'booking_ids': sorted(finished),
+            'skipped': [i for i in booking_ids or [] if i not in finished_set],
+        }, status=status.HTTP_200_OK)
+
+class BookingBulkCancelView(BookingBulkTransitionView):
+    target_status = 'cancelled'
+
+class BookingBulkCompleteView(BookingBulkTransitionView):
+    target_status = 'completed'
 
 class BookingDetailView(generics.RetrieveAPIView):
     queryset = Booking.objects.all()
@@ -115,4 +372,104 @@ class BookingDetailView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return super().get_queryset().filter(user=self.request.user)
\ No newline at end of file
+        return super().get_queryset().filter(user=self.request.user)
+
+def _datetime_param(params, name):
+    value = params.get(name)
+    try:
+        moment = parse_datetime(value) if value else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: 'Must be an ISO 8601 date/time.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+class BookingAvailabilityView(APIView):
+    """
+    Free slots at a premise for a time window:
+    ``?premise_id=<id>&start=<iso datetime>&end=<iso datetime>``. The window
+    is counted in the same slot buckets reservations use.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            premise = Premise.objects.only('id', 'total').get(pk=int(params.get('premise_id', '')))
+        except (ValueError, Premise.DoesNotExist):
+            raise ValidationError({'premise_id': 'A valid premise id is required.'})
+
+        window = {name: _datetime_param(params, name) for name in ('start', 'end')}
+        if window['end'] <= window['start']:
+            raise ValidationError({'end': 'Must be after start.'})
+
+        # Ask about the buckets a booking for this window would take.
+        free = get_timeline(premise.pk).free_slots(premise.total, *slot_buckets(window['start'], window['end']))
+        return Response({
+            'premise_id': premise.pk,
+            'start': window['start'],
+            'end': window['end'],
+            'total': premise.total,
+            'free_slots': free,
+        })
+
+class OccupancyRollupView(APIView):
+    """
+    Staff dashboard data from the pre-aggregated hourly rollups:
+    ``?premise_id=<id>&start=<iso>&end=<iso>&bucket=hour|day``. Only
+    buckets with activity are returned; ``occupancy`` is the share of the
+    premise's slot time that was booked.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    MAX_SPAN = {'hour': datetime.timedelta(days=31), 'day': datetime.timedelta(days=366)}
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            premise = Premise.objects.only('id', 'total').get(pk=int(params.get('premise_id', '')))
+        except (ValueError, Premise.DoesNotExist):
+            raise ValidationError({'premise_id': 'A valid premise id is required.'})
+        bucket = params.get('bucket', 'hour')
+        if bucket not in self.MAX_SPAN:
+            raise ValidationError({'bucket': 'Must be "hour" or "day".'})
+        start, end = _datetime_param(params, 'start'), _datetime_param(params, 'end')
+        if end <= start:
+            raise ValidationError({'end': 'Must be after start.'})
+        if end - start > self.MAX_SPAN[bucket]:
+            raise ValidationError({'end': f'At most {self.MAX_SPAN[bucket].days} days per {bucket} query.'})
+
+        rollups = OccupancyRollup.objects.filter(premise=premise, hour__gte=start, hour__lt=end)
+        if bucket == 'day':
+            rollups = (
+                rollups
+                .annotate(bucket=TruncDay('hour', tzinfo=datetime.timezone.utc))
+                .values('bucket')
+                .annotate(
+                    booked_seconds=Sum('booked_seconds'), revenue=Sum('revenue'),
+                    bookings=Sum('bookings'), cancellations=Sum('cancellations'),
+                )
+            )
+        else:
+            rollups = rollups.annotate(bucket=F('hour')).values(
+                'bucket', 'booked_seconds', 'revenue', 'bookings', 'cancellations',
+            )
+        bucket_seconds = 3600 * (24 if bucket == 'day' else 1)
+        capacity = premise.total * bucket_seconds
+        return Response({
+            'premise_id': premise.pk,
+            'total': premise.total,
+            'bucket': bucket,
+            'rows': [
+                {
+                    'start': row['bucket'],
+                    'booked_slot_hours': round(row['booked_seconds'] / 3600, 2),
+                    'occupancy': round(row['booked_seconds'] / capacity, 4) if capacity else None,
+                    'revenue': row['revenue'],
+                    'bookings': row['bookings'],
+                    'cancellations': row['cancellations'],
+                }
+                for row in rollups.order_by('bucket')
+            ],
+        })
@@ -0,0 +1,4 @@
+from django.contrib import admin
+from .models import IdempotencyKey
+# Register your models here.
+admin.site.register(IdempotencyKey)
@@ -0,0 +1,136 @@
+"""
+``Idempotency-Key`` support for create endpoints.
+
+The first request with a key claims a row in ``IdempotencyKey`` before the
+view runs; its response (unless it is a 5xx, which the client should be
+able to retry) is stored on that row. A repeat of the same request with
+the same key gets the stored response back without running the view
+again, so no inserts, signals or external calls are repeated. Keys are
+scoped per endpoint and per user (anonymous clients by address and user
+agent) and expire after ``settings.IDEMPOTENCY_KEY_TTL`` seconds.
+
+A request that died without answering (worker killed, connection lost)
+leaves its row unfinished. Repeats get a 409 with ``Retry-After`` until
+the row is ``settings.IDEMPOTENCY_LOCK_TIMEOUT`` seconds old; after that
+the next repeat takes the row over and runs the view.
+"""
+import hashlib
+import json
+import math
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _owner(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    # Anonymous keys must not be replayable by other clients.
+    client = f"{BaseThrottle().get_ident(request)}\n{request.headers.get('User-Agent', '')}"
+    return f"anonymous:{hashlib.sha256(client.encode()).hexdigest()[:32]}"
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+
+def _claim(scope, owner, key, fingerprint):
+    """
+    Returns ``(record, created)``; an expired record is replaced, and an
+    unfinished one whose request has been gone for longer than the lock
+    timeout is taken over.
+    """
+    now = timezone.now()
+    ttl = timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+    IdempotencyKey.objects.filter(scope=scope, owner=owner, key=key, expires_at__lte=now).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                scope=scope, owner=owner, key=key, fingerprint=fingerprint,
+                locked_at=now, expires_at=now + ttl,
+            )
+        return record, True
+    except IntegrityError:
+        record = IdempotencyKey.objects.get(scope=scope, owner=owner, key=key)
+    if (
+        record.status_code is None
+        and record.fingerprint == fingerprint
+        and IdempotencyKey.objects.filter(
+            pk=record.pk, status_code__isnull=True, locked_at=record.locked_at,
+            locked_at__lte=now - _lock_timeout(),
+        ).update(locked_at=now)
+    ):
+        record.locked_at = now
+        return record, True
+    return record, False
+
+
+def _ours(record):
+    """The record, if no retry has taken it over since this request claimed it."""
+    return IdempotencyKey.objects.filter(pk=record.pk, locked_at=record.locked_at)
+
+
+def idempotent(scope):
+    """Decorate a DRF view function or method that creates something."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            fingerprint = _fingerprint(request)
+            record, created = _claim(scope, _owner(request), key, fingerprint)
+            if not created:
+                if record.fingerprint != fingerprint:
+                    return Response(
+                        {"error": f"{HEADER} was already used for a different request"},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if record.status_code is None:
+                    retry_after = record.locked_at + _lock_timeout() - timezone.now()
+                    return Response(
+                        {"error": f"A request with this {HEADER} is still in progress"},
+                        status=status.HTTP_409_CONFLICT,
+                        headers={'Retry-After': str(max(1, math.ceil(retry_after.total_seconds())))},
+                    )
+                return Response(
+                    record.response_body, status=record.status_code,
+                    headers={'Idempotent-Replayed': 'true'},
+                )
+
+            try:
+                response = view(*args, **kwargs)
+            except Exception:
+                _ours(record).delete()
+                raise
+            if response.status_code >= 500:
+                _ours(record).delete()
+            else:
+                _ours(record).update(status_code=response.status_code, response_body=response.data)
+            return response
+        return wrapper
+    return decorator
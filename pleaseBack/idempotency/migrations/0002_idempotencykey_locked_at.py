@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-17 22:01
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('idempotency', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='locked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
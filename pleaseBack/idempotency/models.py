@@ -0,0 +1,28 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied ``Idempotency-Key`` and the response first returned
+    for it. ``status_code`` is null while that first request is running;
+    ``locked_at`` is when it (or a retry that took over from it) started.
+    """
+    scope = models.CharField(max_length=50)
+    owner = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    locked_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'owner', 'key'], name='idempotency_key_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.owner} {self.key}"
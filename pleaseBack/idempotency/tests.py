@@ -0,0 +1,116 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+
+from bookings.models import Booking, SmsOutbox
+from premises.models import Premise
+from .models import IdempotencyKey
+from .decorators import idempotent
+
+User = get_user_model()
+
+calls = []
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@idempotent('tests.echo')
+def echo(request):
+    calls.append(request.data)
+    if request.data.get('fail'):
+        return Response({'error': 'upstream down'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return Response({'call': len(calls)}, status=status.HTTP_201_CREATED)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.factory = APIRequestFactory()
+
+    def post(self, data=None, key='key-1', **extra):
+        request = self.factory.post('/echo/', data or {'plan': 'basic'}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY=key, **extra)
+        return echo(request)
+
+    def test_repeat_while_in_progress_then_take_over_when_stale(self):
+        self.assertEqual(self.post().status_code, 201)
+        # The first request died before storing its response.
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+
+        response = self.post()
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(len(calls), 1)
+
+        IdempotencyKey.objects.update(locked_at=timezone.now() - timedelta(seconds=61))
+        response = self.post()
+        self.assertEqual((response.status_code, response.data), (201, {'call': 2}))
+        replay = self.post()
+        self.assertEqual(replay.data, {'call': 2})
+        self.assertEqual(len(calls), 2)
+
+    def test_server_errors_are_not_stored(self):
+        self.assertEqual(self.post({'fail': True}).status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post({'fail': True}).status_code, 503)
+        self.assertEqual(len(calls), 2)
+
+    def test_expired_keys_run_again_and_are_purged(self):
+        self.post()
+        self.post(key='key-2')
+        IdempotencyKey.objects.filter(key='key-1').update(expires_at=timezone.now())
+        self.assertEqual(self.post().data, {'call': 3})
+
+        IdempotencyKey.objects.filter(key='key-2').update(expires_at=timezone.now())
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['key-1'])
+
+    def test_anonymous_keys_are_scoped_to_the_client(self):
+        self.post(HTTP_USER_AGENT='Phone')
+        self.assertEqual(self.post(HTTP_USER_AGENT='Phone')['Idempotent-Replayed'], 'true')
+        other = self.post(HTTP_USER_AGENT='Laptop')
+        self.assertEqual(other.data, {'call': 2})
+        elsewhere = self.post(HTTP_USER_AGENT='Phone', REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(elsewhere.data, {'call': 3})
+
+
+class IdempotentBookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('retrier', 'retrier@example.com', 'pass12345')
+        self.premise = Premise.objects.create(
+            name='Test Parking', location='Alkapuri, Vadodara', latitude=22.3, longitude=73.18,
+            price='₹20/hour', available=2, total=2,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {'premise_id': self.premise.pk, 'name': 'Retrier', 'phone': '9876543210', 'duration': 1}
+
+    def post(self, payload, key='retry-1'):
+        return self.client.post('/api/bookings/bookings/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response_without_side_effects(self):
+        first = self.post(self.payload)
+        self.assertEqual(first.status_code, 201)
+        replay = self.post(self.payload)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.data['id'], first.data['id'])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(SmsOutbox.objects.count(), 1)
+        self.premise.refresh_from_db()
+        self.assertEqual(self.premise.available, 1)
+
+    def test_key_reused_for_different_request(self):
+        self.post(self.payload)
+        response = self.post({**self.payload, 'duration': 2})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.post({**self.payload, 'duration': 2}, key='retry-2').status_code, 201)
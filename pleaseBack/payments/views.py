@@ -8,6 +8,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
+from idempotency.decorators import idempotent
+
 from .models import Payment
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,7 @@ stripe.api_key = settings.STRIPE_SECRET_KEY
 # ------------------------------------------------------------------
 @api_view(['POST'])
 @permission_classes([AllowAny]) # or IsAuthenticated if you require login
+@idempotent('payments.checkout')
 def create_checkout_session(request):
     try:
         data = request.data
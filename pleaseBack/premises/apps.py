@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class PremisesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'premises'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from . import signals  # noqa: F401
+        from .search import ensure_sqlite_triggers
+
+        post_migrate.connect(ensure_sqlite_triggers, sender=self)
@@ -0,0 +1,82 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+PAYLOAD_TIMEOUT = 600
+
+
+def premises_version():
+    """
+    ``(version, last_modified)`` of the premise data: the id of the newest
+    ``PremiseChange`` and its epoch seconds, ``(0, 0)`` before any change.
+
+    It lives in the database, so web workers, the sweeper cron and the SMS
+    worker all agree on it; cached premise payloads are keyed by it, so a
+    new change invalidates all of them at once. One primary key lookup.
+    """
+    from .models import PremiseChange
+
+    row = PremiseChange.objects.order_by('-id').values_list('id', 'created_at').first()
+    if row is None:
+        return 0, 0
+    return row[0], int(row[1].timestamp())
+
+
+def get_premises_version():
+    return premises_version()[0]
+
+
+def record_premise_changes(premise_ids, kind):
+    """
+    Log a ``kind`` change for each of ``premise_ids`` once the current
+    transaction commits. Writing after the commit means any reader that
+    sees the new version also sees the data it stands for.
+    """
+    from .models import PremiseChange
+
+    ids = sorted(set(premise_ids))
+    if ids:
+        transaction.on_commit(
+            lambda: PremiseChange.objects.bulk_create([PremiseChange(premise_id=pk, kind=kind) for pk in ids])
+        )
+
+
+class PremiseVersionCacheMixin:
+    """
+    Conditional GET and payload caching for premise views.
+
+    The ETag is derived from the premises version and the normalized query,
+    so unchanged polls get a 304 after a single version lookup. On a miss
+    the serialized data is cached under the same version.
+    """
+
+    def get(self, request, *args, **kwargs):
+        version, modified = premises_version()
+        query = sorted(request.query_params.lists())
+        digest = hashlib.md5(
+            repr((request.path, query, request.accepted_renderer.format)).encode()
+        ).hexdigest()
+        etag = f'W/"premises-{version}-{digest[:16]}"'
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=modified)
+        if not_modified is not None:
+            response = not_modified
+        else:
+            key = f'premises:payload:{version}:{digest}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code == 200:
+                    cache.set(key, response.data, PAYLOAD_TIMEOUT)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(modified)
+            response['Cache-Control'] = 'no-cache'
+        return response
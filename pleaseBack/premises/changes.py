@@ -0,0 +1,71 @@
+"""
+Following the premise change log (``PremiseChange``) from one process.
+
+Each process keeps its own in-memory views of premises (the spatial and
+suggest indexes, the availability stream); a ``ChangeFeed`` tells it which
+premises other processes changed since it last looked. Rows are written
+after their transaction commits, so they can appear slightly out of id
+order: the feed re-reads a short window behind the newest row it has seen
+and skips ids it already returned.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.utils import timezone
+
+# How far behind the newest row seen each poll looks again, for rows whose
+# commit lagged (or whose writer's clock does).
+LATE_COMMIT_GRACE = timedelta(seconds=5)
+
+
+class ChangeFeed:
+    """
+    ``poll()`` returns ``(id, premise_id, kind)`` rows logged since the
+    previous poll, at most once every ``interval`` seconds; calls in between,
+    or while another thread is polling, return an empty list.
+    """
+
+    def __init__(self, kinds=None, interval=0):
+        self.kinds = kinds
+        self.interval = interval
+        self._since = None
+        self._seen = set()
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Follow changes logged from now on."""
+        with self._lock:
+            self._since = timezone.now()
+            self._seen = set()
+            self._next_poll = time.monotonic() + self.interval
+
+    def poll(self):
+        from .models import PremiseChange
+
+        if time.monotonic() < self._next_poll or not self._lock.acquire(blocking=False):
+            return []
+        try:
+            if time.monotonic() < self._next_poll:
+                return []
+            if self._since is None:
+                self._since = timezone.now()
+            queryset = PremiseChange.objects.filter(created_at__gte=self._since - LATE_COMMIT_GRACE)
+            if self.kinds is not None:
+                queryset = queryset.filter(kind__in=self.kinds)
+            rows = list(queryset.order_by('id').values_list('id', 'premise_id', 'kind', 'created_at'))
+            fresh = [row[:3] for row in rows if row[0] not in self._seen]
+            # The next window starts no earlier than this one, so only the
+            # ids read now can come back.
+            self._seen = {row[0] for row in rows}
+            if rows:
+                self._since = max(self._since, max(row[3] for row in rows))
+            self._next_poll = time.monotonic() + self.interval
+            return fresh
+        finally:
+            self._lock.release()
+
+    def changed_premise_ids(self):
+        """Ids of the premises changed since the previous poll."""
+        return {premise_id for _, premise_id, _ in self.poll()}
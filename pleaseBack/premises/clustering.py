@@ -0,0 +1,109 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Min, Sum
+from django.db.models.functions import Floor
+
+from .cache import get_premises_version
+from .models import Premise
+
+MAX_ZOOM = 20
+# Each tile is split into CLUSTER_GRID x CLUSTER_GRID cluster cells, so the
+# cells of a tile at zoom z line up with the tiles at zoom z + 3.
+CLUSTER_GRID = 8
+MAX_TILES = 64
+TILE_CACHE_TIMEOUT = 300
+
+
+def tile_size(zoom):
+    """Edge length of a tile in degrees. Zoom 0 is one 360 degree tile."""
+    return 360.0 / (2 ** zoom)
+
+
+def _tile_ranges(min_lng, min_lat, max_lng, max_lat, zoom):
+    size = tile_size(zoom)
+    last = 2 ** zoom - 1
+    x0 = max(0, math.floor((min_lng + 180) / size))
+    x1 = min(last, math.floor((max_lng + 180) / size))
+    y0 = max(0, math.floor((min_lat + 90) / size))
+    y1 = min(last, math.floor((max_lat + 90) / size))
+    return range(x0, x1 + 1), range(y0, y1 + 1)
+
+
+def tile_count(min_lng, min_lat, max_lng, max_lat, zoom):
+    """How many tiles ``tiles_for_bbox`` would yield, without listing them."""
+    columns, rows = _tile_ranges(min_lng, min_lat, max_lng, max_lat, zoom)
+    return len(columns) * len(rows)
+
+
+def tiles_for_bbox(min_lng, min_lat, max_lng, max_lat, zoom):
+    """Yield the ``(x, y)`` tiles covering the bbox; check ``tile_count`` first."""
+    columns, rows = _tile_ranges(min_lng, min_lat, max_lng, max_lat, zoom)
+    for x in columns:
+        for y in rows:
+            yield x, y
+
+
+def tile_clusters(zoom, x, y, version=None):
+    """Clusters for one tile, cached until the premises version changes."""
+    if version is None:
+        version = get_premises_version()
+    key = f'premises:clusters:{version}:{zoom}:{x}:{y}'
+    clusters = cache.get(key)
+    if clusters is None:
+        clusters = _compute_tile(zoom, x, y)
+        cache.set(key, clusters, TILE_CACHE_TIMEOUT)
+    return clusters
+
+
+def _compute_tile(zoom, x, y):
+    size = tile_size(zoom)
+    cell = size / CLUSTER_GRID
+    min_lng = x * size - 180
+    min_lat = y * size - 90
+
+    rows = (
+        Premise.objects
+        .filter(
+            latitude__gte=min_lat, latitude__lt=min_lat + size,
+            longitude__gte=min_lng, longitude__lt=min_lng + size,
+        )
+        .annotate(
+            cell_row=Floor((F('latitude') - min_lat) / cell),
+            cell_col=Floor((F('longitude') - min_lng) / cell),
+        )
+        .values('cell_row', 'cell_col')
+        .annotate(
+            count=Count('id'),
+            lat=Avg('latitude'),
+            lng=Avg('longitude'),
+            available=Sum('available'),
+            total=Sum('total'),
+            premise_id=Min('id'),
+        )
+        .order_by()
+    )
+
+    clusters = []
+    for row in rows:
+        cluster = {
+            'lat': round(row['lat'], 6),
+            'lng': round(row['lng'], 6),
+            'count': row['count'],
+            'available': row['available'],
+            'total': row['total'],
+        }
+        if row['count'] == 1:
+            cluster['premise_id'] = row['premise_id']
+        clusters.append(cluster)
+    return clusters
+
+
+def clusters_for_bbox(min_lng, min_lat, max_lng, max_lat, zoom):
+    clusters = []
+    version = get_premises_version()
+    for x, y in tiles_for_bbox(min_lng, min_lat, max_lng, max_lat, zoom):
+        for cluster in tile_clusters(zoom, x, y, version):
+            if min_lat <= cluster['lat'] <= max_lat and min_lng <= cluster['lng'] <= max_lng:
+                clusters.append(cluster)
+    return clusters
@@ -0,0 +1,170 @@
+"""
+Availability pub/sub.
+
+Booking and premise changes publish compact ``{"premise_id", "available"}``
+deltas here and the SSE endpoint streams them to map clients. The broker is
+chosen by ``settings.AVAILABILITY_BROKER`` (a dotted path). The default,
+``ChangeLogBroker``, reads the premise change log, so a stream sees changes
+made by any process (web workers, the sweeper cron, management commands);
+``InProcessBroker`` only sees its own process's.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils.module_loading import import_string
+
+from .changes import ChangeFeed
+
+SUBSCRIBER_QUEUE_SIZE = 256
+# Seconds between change log reads while a stream is open.
+CHANGE_LOG_POLL_SECONDS = 1
+
+
+class InProcessBroker:
+    """Fan-out to subscribers in this process. ``publish`` is thread safe."""
+
+    # Whether the broker finds changes in the change log by itself, making
+    # direct publishing unnecessary.
+    follows_change_log = False
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Register a queue bound to the running event loop."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Loop already closed; the subscriber is gone.
+                self.unsubscribe((loop, queue))
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+class ChangeLogBroker(InProcessBroker):
+    """
+    Streams the availability of premises as the change log records them.
+    While anyone is subscribed a background thread reads the log every
+    ``CHANGE_LOG_POLL_SECONDS`` and publishes the current ``available`` of
+    the premises that changed. Direct ``publish`` calls are ignored: the
+    same changes arrive through the log.
+    """
+    follows_change_log = True
+
+    def __init__(self, interval=CHANGE_LOG_POLL_SECONDS):
+        super().__init__()
+        self._feed = ChangeFeed(kinds=('saved', 'availability'))
+        self.interval = interval
+        self._poller = None
+
+    def subscribe(self):
+        subscription = super().subscribe()
+        with self._lock:
+            if self._poller is None:
+                self._feed.start()
+                self._poller = threading.Thread(target=self._follow, name='availability-changes', daemon=True)
+                self._poller.start()
+        return subscription
+
+    def publish(self, event):
+        pass
+
+    def deliver_changes(self):
+        """Publish the availability of premises changed since the last call."""
+        from .models import Premise
+
+        changed = self._feed.changed_premise_ids()
+        if changed:
+            for pk, available in Premise.objects.filter(pk__in=changed).values_list('id', 'available'):
+                super().publish({'premise_id': pk, 'available': available})
+
+    def _follow(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._poller = None
+                        return
+                close_old_connections()
+                try:
+                    self.deliver_changes()
+                except DatabaseError:
+                    # Try again next tick with a fresh connection.
+                    connection.close()
+                time.sleep(self.interval)
+        finally:
+            with self._lock:
+                if self._poller is threading.current_thread():
+                    self._poller = None
+            connection.close()
+
+
+def _offer(queue, event):
+    # A slow client loses its oldest deltas rather than blocking publishers.
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'AVAILABILITY_BROKER', 'premises.events.ChangeLogBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def notify_availability_changed(premise_ids):
+    """
+    After commit, record the change (bumping the premises version) and
+    publish the committed availability of ``premise_ids``. Used by code that
+    updates ``available`` with queryset ``update()``, which sends no signals.
+    """
+    from .cache import record_premise_changes
+    from .models import Premise
+
+    ids = set(premise_ids)
+    if not ids:
+        return
+
+    record_premise_changes(ids, 'availability')
+
+    def notify():
+        broker = get_broker()
+        if broker.follows_change_log or not broker.subscriber_count:
+            return
+        for pk, available in Premise.objects.filter(pk__in=ids).values_list('id', 'available'):
+            broker.publish({'premise_id': pk, 'available': available})
+
+    transaction.on_commit(notify)
+
+
+def publish_availability(premise_id, available):
+    """Publish an availability delta once the current transaction commits."""
+    event = {'premise_id': premise_id, 'available': available}
+    transaction.on_commit(lambda: get_broker().publish(event))
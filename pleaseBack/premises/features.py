@@ -0,0 +1,22 @@
+from django.utils.text import slugify
+
+
+def feature_tags(features):
+    """
+    Normalized tags for a premise's ``features`` list. Each feature is stored
+    as its slug and as its individual words, so ``"EV Charging"`` can be
+    matched by ``ev-charging``, ``ev`` or ``charging``.
+    """
+    tags = set()
+    for feature in features or []:
+        slug = slugify(str(feature))[:64]
+        if not slug:
+            continue
+        tags.add(slug)
+        tags.update(word for word in slug.split('-') if word)
+    return tags
+
+
+def query_tags(raw):
+    """Tags requested by a comma separated ``?features=`` value."""
+    return {slugify(part)[:64] for part in raw.split(',') if slugify(part)}
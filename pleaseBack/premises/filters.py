@@ -0,0 +1,58 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .features import query_tags
+from .models import PremiseFeature
+
+
+def _decimal_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValidationError({name: 'A valid number is required.'})
+    if not value.is_finite():
+        raise ValidationError({name: 'A finite number is required.'})
+    return value
+
+
+class PriceFilter(BaseFilterBackend):
+    """``?min_price=&max_price=`` on the indexed ``price_per_hour`` column."""
+
+    def filter_queryset(self, request, queryset, view):
+        min_price = _decimal_param(request.query_params, 'min_price')
+        max_price = _decimal_param(request.query_params, 'max_price')
+        if min_price is not None:
+            queryset = queryset.filter(price_per_hour__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price_per_hour__lte=max_price)
+        return queryset
+
+
+class FeatureFilter(BaseFilterBackend):
+    """
+    ``?features=ev,covered`` keeps premises having every requested tag. The
+    match is resolved on the (tag, premise) index of ``PremiseFeature``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        raw = request.query_params.get('features')
+        if not raw:
+            return queryset
+        tags = query_tags(raw)
+        if not tags:
+            return queryset
+        matching = (
+            PremiseFeature.objects
+            .filter(tag__in=tags)
+            .values('premise_id')
+            .annotate(matched=Count('tag'))
+            .filter(matched=len(tags))
+            .values('premise_id')
+        )
+        return queryset.filter(id__in=matching)
@@ -0,0 +1,75 @@
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Size of one grid bucket in degrees (~11 km of latitude). Each premise stores
+# the bucket it falls into so radius lookups only scan the neighbouring cells.
+GRID_CELL_DEG = 0.1
+# Grid columns around the globe.
+GRID_COLUMNS = round(360 / GRID_CELL_DEG)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+def cell_index(lat, lng):
+    return math.floor(lat / GRID_CELL_DEG), math.floor(lng / GRID_CELL_DEG)
+
+
+def cell_key(lat, lng):
+    """Grid bucket key stored on ``Premise.geo_cell``."""
+    row, col = cell_index(lat, lng)
+    return f"{row}:{col}"
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Return (min_lat, max_lat, min_lng, max_lng) enclosing the radius.
+    Longitudes are not wrapped, so the box may extend past -180 or 180
+    (see ``longitude_ranges``); it spans 360 degrees if it reaches a pole.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    cos_lat = math.cos(math.radians(lat))
+    if lat + dlat >= 90.0 or lat - dlat <= -90.0 or math.sin(angle) >= cos_lat:
+        dlng = 180.0
+    else:
+        dlng = math.degrees(math.asin(math.sin(angle) / cos_lat))
+    return (
+        max(-90.0, lat - dlat),
+        min(90.0, lat + dlat),
+        lng - dlng,
+        lng + dlng,
+    )
+
+
+def longitude_ranges(min_lng, max_lng):
+    """Split a longitude span that may cross the antimeridian into ranges within [-180, 180]."""
+    if max_lng - min_lng >= 360.0:
+        return [(-180.0, 180.0)]
+    if min_lng < -180.0:
+        return [(min_lng + 360.0, 180.0), (-180.0, max_lng)]
+    if max_lng > 180.0:
+        return [(min_lng, 180.0), (-180.0, max_lng - 360.0)]
+    return [(min_lng, max_lng)]
+
+
+def cells_in_box(min_lat, max_lat, min_lng, max_lng):
+    """Every grid bucket key overlapping the bounding box."""
+    keys = []
+    for range_min_lng, range_max_lng in longitude_ranges(min_lng, max_lng):
+        min_row, min_col = cell_index(min_lat, range_min_lng)
+        max_row, max_col = cell_index(max_lat, range_max_lng)
+        keys += [
+            f"{row}:{col}"
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+        ]
+    return keys
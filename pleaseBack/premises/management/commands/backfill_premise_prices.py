@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from premises.models import Premise
+
+
+class Command(BaseCommand):
+    help = "Fill price_per_hour/price_currency/price_unit/price_amount from the free-text price, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true',
+                            help='Recompute every premise, not only those without a parsed price')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Premise.objects.only('id', 'price').order_by('id')
+        if not options['all']:
+            queryset = queryset.filter(price_per_hour__isnull=True)
+
+        updated = unparsed = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for premise in batch:
+                premise.apply_price()
+                if premise.price_per_hour is None:
+                    unparsed += 1
+            Premise.objects.bulk_update(batch, ['price_per_hour', 'price_currency', 'price_unit', 'price_amount'])
+            updated += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Processed {updated} premises...")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} premises."))
+        if unparsed:
+            self.stdout.write(self.style.WARNING(f"{unparsed} premises have a price that could not be parsed."))
@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from premises.geo import cell_key
+from premises.models import Premise
+from premises.services import nearest_premises_sql
+from premises.spatial import SpatialIndex
+
+# Rough bounding box of India, where the real premises live.
+LAT_RANGE = (8.0, 35.0)
+LNG_RANGE = (68.0, 97.0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the in-memory spatial index against the SQL bounding-box "
+        "lookup. Synthetic premises are inserted inside a transaction that is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma separated premise counts to test')
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--radius-km', type=float, default=5.0)
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        radius_km, limit = options['radius_km'], options['limit']
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        self.stdout.write(f"{'premises':>10} {'build ms':>10} {'memory ms/q':>12} {'sql ms/q':>10} {'speedup':>8}")
+        for size in sizes:
+            points = [
+                (rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+                for _ in range(size)
+            ]
+            queries = [
+                (rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE))
+                for _ in range(options['queries'])
+            ]
+
+            with transaction.atomic():
+                self._seed(points)
+                ids = list(Premise.objects.values_list('id', 'latitude', 'longitude'))
+
+                index = SpatialIndex()
+                started = time.perf_counter()
+                index.load(ids)
+                build_ms = (time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                for lat, lng in queries:
+                    index.nearest(lat, lng, limit, radius_km)
+                memory_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+                queryset = Premise.objects.all()
+                started = time.perf_counter()
+                for lat, lng in queries:
+                    nearest_premises_sql(queryset, lat, lng, radius_km, limit)
+                sql_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                f"{size:>10} {build_ms:>10.1f} {memory_ms:>12.4f} {sql_ms:>10.4f} "
+                f"{sql_ms / memory_ms if memory_ms else 0:>7.1f}x"
+            )
+
+    def _seed(self, points, batch_size=5000):
+        Premise.objects.all().delete()
+        for start in range(0, len(points), batch_size):
+            Premise.objects.bulk_create([
+                Premise(
+                    name=f"Bench {start + i}",
+                    location="Benchmark",
+                    latitude=lat,
+                    longitude=lng,
+                    price="₹20/hour",
+                    available=10,
+                    total=10,
+                    geo_cell=cell_key(lat, lng),
+                )
+                for i, (lat, lng) in enumerate(points[start:start + batch_size])
+            ])
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from premises.models import PremiseChange
+
+
+class Command(BaseCommand):
+    help = "Delete old premise change log rows, keeping the newest (the current premises version)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-hours', type=float, default=24,
+                            help='Keep rows newer than this many hours')
+
+    def handle(self, *args, **options):
+        newest = PremiseChange.objects.order_by('-id').values_list('id', flat=True).first()
+        if newest is None:
+            self.stdout.write(self.style.SUCCESS("Deleted 0 premise changes."))
+            return
+        cutoff = timezone.now() - timedelta(hours=options['keep_hours'])
+        deleted, _ = PremiseChange.objects.filter(created_at__lt=cutoff, id__lt=newest).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} premise changes."))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:55
+
+from django.db import migrations, models
+
+from premises.geo import cell_key
+
+
+def populate_geo_cell(apps, schema_editor):
+    Premise = apps.get_model('premises', 'Premise')
+    batch = []
+    for premise in Premise.objects.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+        premise.geo_cell = cell_key(premise.latitude, premise.longitude)
+        batch.append(premise)
+        if len(batch) >= 2000:
+            Premise.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    if batch:
+        Premise.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('premises', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='premise',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='premise',
+            index=models.Index(fields=['latitude', 'longitude'], name='premise_lat_lng_idx'),
+        ),
+        migrations.RunPython(populate_geo_cell, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('premises', '0002_premise_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='premise',
+            name='price_currency',
+            field=models.CharField(default='INR', editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='premise',
+            name='price_per_hour',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='premise',
+            name='price_unit',
+            field=models.CharField(default='hour', editable=False, max_length=10),
+        ),
+    ]
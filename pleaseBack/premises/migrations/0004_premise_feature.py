@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-17 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from premises.features import feature_tags
+
+
+def populate_feature_tags(apps, schema_editor):
+    Premise = apps.get_model('premises', 'Premise')
+    PremiseFeature = apps.get_model('premises', 'PremiseFeature')
+    batch = []
+    for premise_id, features in Premise.objects.values_list('id', 'features').iterator(chunk_size=2000):
+        batch.extend(PremiseFeature(premise_id=premise_id, tag=tag) for tag in feature_tags(features))
+        if len(batch) >= 5000:
+            PremiseFeature.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        PremiseFeature.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('premises', '0003_premise_price_per_hour'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PremiseFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=64)),
+                ('premise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feature_tags', to='premises.premise')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tag', 'premise'), name='premise_feature_tag_unique')],
+            },
+        ),
+        migrations.RunPython(populate_feature_tags, migrations.RunPython.noop),
+    ]
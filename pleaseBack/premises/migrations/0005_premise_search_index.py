@@ -0,0 +1,89 @@
+from django.db import migrations
+
+# PostgreSQL: GIN indexes for full-text and trigram search. The indexed
+# expressions must stay identical to PG_DOCUMENT / PG_TRIGRAM_TEXT in
+# premises.search for the planner to use them.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE INDEX IF NOT EXISTS premise_search_document_idx ON premises_premise USING gin (
+        to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(location, '')
+        || ' ' || coalesce(description, ''))
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS premise_search_trigram_idx ON premises_premise USING gin (
+        (coalesce(name, '') || ' ' || coalesce(location, '')) gin_trgm_ops
+    )
+    """,
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS premise_search_trigram_idx",
+    "DROP INDEX IF EXISTS premise_search_document_idx",
+]
+
+# SQLite: external-content FTS5 table kept in sync with triggers. SQLite
+# drops the triggers when Django rebuilds premises_premise during an
+# AlterField; premises.search.ensure_sqlite_triggers puts them back after
+# every migrate.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS premises_premise_fts USING fts5(
+        name, location, description,
+        content='premises_premise', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS premises_premise_fts_ai AFTER INSERT ON premises_premise BEGIN
+        INSERT INTO premises_premise_fts(rowid, name, location, description)
+        VALUES (new.id, new.name, new.location, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS premises_premise_fts_ad AFTER DELETE ON premises_premise BEGIN
+        INSERT INTO premises_premise_fts(premises_premise_fts, rowid, name, location, description)
+        VALUES ('delete', old.id, old.name, old.location, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS premises_premise_fts_au
+    AFTER UPDATE OF name, location, description ON premises_premise BEGIN
+        INSERT INTO premises_premise_fts(premises_premise_fts, rowid, name, location, description)
+        VALUES ('delete', old.id, old.name, old.location, old.description);
+        INSERT INTO premises_premise_fts(rowid, name, location, description)
+        VALUES (new.id, new.name, new.location, new.description);
+    END
+    """,
+    "INSERT INTO premises_premise_fts(premises_premise_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS premises_premise_fts_au",
+    "DROP TRIGGER IF EXISTS premises_premise_fts_ad",
+    "DROP TRIGGER IF EXISTS premises_premise_fts_ai",
+    "DROP TABLE IF EXISTS premises_premise_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def _run(direction):
+    def run(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements:
+            for sql in statements[direction]:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('premises', '0004_premise_feature'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(0), _run(1)),
+    ]
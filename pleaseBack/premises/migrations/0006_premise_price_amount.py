@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+from premises.pricing import hourly_rate, parse_price
+
+PRICE_FIELDS = ['price_amount', 'price_per_hour', 'price_currency', 'price_unit']
+
+
+def populate_parsed_prices(apps, schema_editor):
+    # All derived price fields at once, so no premise is left with an amount
+    # but a stale unit or hourly rate until backfill_premise_prices runs.
+    Premise = apps.get_model('premises', 'Premise')
+    batch = []
+    for premise in Premise.objects.only('id', 'price').iterator(chunk_size=2000):
+        parsed = parse_price(premise.price)
+        if parsed is None:
+            continue
+        premise.price_amount = parsed.amount
+        premise.price_per_hour = hourly_rate(parsed)
+        premise.price_currency, premise.price_unit = parsed.currency, parsed.unit
+        batch.append(premise)
+        if len(batch) >= 2000:
+            Premise.objects.bulk_update(batch, PRICE_FIELDS)
+            batch = []
+    if batch:
+        Premise.objects.bulk_update(batch, PRICE_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('premises', '0005_premise_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='premise',
+            name='price_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(populate_parsed_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-17 23:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('premises', '0006_premise_price_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PremiseChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('premise_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('saved', 'Saved'), ('deleted', 'Deleted'), ('availability', 'Availability')], max_length=12)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -1,4 +1,8 @@
 from django.db import models
+from django.utils import timezone
+
+from .geo import cell_key
+from .pricing import DEFAULT_CURRENCY, DEFAULT_UNIT, hourly_rate, parse_price
 
 class Premise(models.Model):
     name = models.CharField(max_length=255)
@@ -12,6 +16,90 @@ class Premise(models.Model):
     features = models.JSONField(default=list, blank=True)
     rating = models.FloatField(default=0)
     description = models.TextField(blank=True)
+    # Derived from ``price`` on save, see premises.pricing
+    price_per_hour = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True, editable=False, db_index=True
+    )
+    price_currency = models.CharField(max_length=3, default=DEFAULT_CURRENCY, editable=False)
+    price_unit = models.CharField(max_length=10, default=DEFAULT_UNIT, editable=False)
+    # The parsed amount per ``price_unit``; totals are computed from it
+    price_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+    # Grid bucket of (latitude, longitude), see premises.geo
+    geo_cell = models.CharField(max_length=32, blank=True, editable=False, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['latitude', 'longitude'], name='premise_lat_lng_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+    # Source field -> columns derived from it in save()
+    DERIVED_FIELDS = {
+        'latitude': {'geo_cell'},
+        'longitude': {'geo_cell'},
+        'price': {'price_per_hour', 'price_currency', 'price_unit', 'price_amount'},
+    }
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = cell_key(self.latitude, self.longitude)
+        self.apply_price()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for field in list(update_fields):
+                update_fields |= self.DERIVED_FIELDS.get(field, set())
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
+    def apply_price(self):
+        parsed = parse_price(self.price)
+        if parsed is None:
+            self.price_per_hour = self.price_amount = None
+            self.price_currency, self.price_unit = DEFAULT_CURRENCY, DEFAULT_UNIT
+        else:
+            self.price_per_hour = hourly_rate(parsed)
+            self.price_amount = parsed.amount
+            self.price_currency, self.price_unit = parsed.currency, parsed.unit
+
+
+class PremiseFeature(models.Model):
+    """
+    One row per normalized feature tag of a premise (see premises.features),
+    kept in sync with ``Premise.features``. The unique (tag, premise) index
+    answers feature filters without touching the premise table.
+    """
+    premise = models.ForeignKey(Premise, on_delete=models.CASCADE, related_name='feature_tags')
+    tag = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'premise'], name='premise_feature_tag_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.premise_id}: {self.tag}"
+
+
+class PremiseChange(models.Model):
+    """
+    Append-only log of premise changes, written right after the transaction
+    that made them commits (see premises.cache). The newest id is the
+    premises version every process agrees on. Trimmed by
+    ``python manage.py purge_premise_changes``.
+    """
+    KIND_CHOICES = [
+        ('saved', 'Saved'),
+        ('deleted', 'Deleted'),
+        ('availability', 'Availability'),
+    ]
+
+    # Not a foreign key: rows outlive the premises they describe.
+    premise_id = models.IntegerField()
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.premise_id} {self.kind} #{self.pk}"
@@ -0,0 +1,71 @@
+import re
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+ParsedPrice = namedtuple('ParsedPrice', ['amount', 'currency', 'unit'])
+
+DEFAULT_CURRENCY = 'INR'
+DEFAULT_UNIT = 'hour'
+
+CURRENCY_SYMBOLS = {
+    '₹': 'INR',
+    'rs': 'INR',
+    'inr': 'INR',
+    '$': 'USD',
+    'usd': 'USD',
+    '€': 'EUR',
+    'eur': 'EUR',
+    '£': 'GBP',
+    'gbp': 'GBP',
+}
+
+UNIT_ALIASES = {
+    'h': 'hour', 'hr': 'hour', 'hrs': 'hour', 'hour': 'hour', 'hours': 'hour',
+    'd': 'day', 'day': 'day', 'days': 'day',
+}
+
+# Hours covered by one unit, used to derive the hourly rate.
+UNIT_HOURS = {'hour': 1, 'day': 24}
+
+CENTS = Decimal('0.01')
+
+_AMOUNT_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def parse_price(price):
+    """
+    Parse a free-text price such as ``"₹20/hour"`` into a ``ParsedPrice``.
+    Returns ``None`` when no amount can be found.
+    """
+    if not price:
+        return None
+    amount_part, _, unit_part = price.partition('/')
+    match = _AMOUNT_RE.search(amount_part)
+    if match is None:
+        return None
+    try:
+        amount = Decimal(match.group().replace(',', ''))
+    except InvalidOperation:
+        return None
+
+    lowered = amount_part.lower()
+    currency = next(
+        (code for symbol, code in CURRENCY_SYMBOLS.items() if symbol in lowered),
+        DEFAULT_CURRENCY,
+    )
+    unit = UNIT_ALIASES.get(unit_part.strip().lower().rstrip('.'), DEFAULT_UNIT)
+    return ParsedPrice(amount, currency, unit)
+
+
+def hourly_rate(parsed):
+    """Rounded hourly rate, for display and filtering; totals use ``total_price``."""
+    return (parsed.amount / UNIT_HOURS[parsed.unit]).quantize(CENTS)
+
+
+def total_price(amount, unit, hours):
+    """
+    Price of ``hours`` at ``amount`` per ``unit``, rounded once at the end so
+    ₹25/day for 24 hours is 25.00 rather than 24 × 1.04.
+    """
+    return (amount * hours / UNIT_HOURS[unit]).quantize(CENTS)
+
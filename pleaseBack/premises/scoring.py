@@ -0,0 +1,80 @@
+import numpy as np
+
+from .geo import EARTH_RADIUS_KM
+
+# Relative weight of each component of the "best spot" score. The distance
+# weight only applies when the caller supplied a location.
+WEIGHTS = {
+    'distance': 0.4,
+    'availability': 0.25,
+    'rating': 0.2,
+    'price': 0.15,
+}
+
+# Columns pulled for each candidate, in the order ``score_premises`` expects.
+CANDIDATE_FIELDS = ('id', 'latitude', 'longitude', 'available', 'total', 'rating', 'price_per_hour')
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Vectorized great-circle distance from one point to arrays of points."""
+    lat, lng = np.radians(lat), np.radians(lng)
+    lats, lngs = np.radians(lats), np.radians(lngs)
+    a = (
+        np.sin((lats - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(1.0, a)))
+
+
+def _normalize(values):
+    if np.isnan(values).all():
+        # Nothing to scale (and nanmin/nanmax would warn).
+        return np.zeros_like(values)
+    low, high = np.nanmin(values), np.nanmax(values)
+    if not np.isfinite(low) or high == low:
+        return np.where(np.isnan(values), 0.0, 1.0)
+    return np.nan_to_num((values - low) / (high - low), nan=0.0)
+
+
+def score_premises(rows, lat=None, lng=None, radius_km=None):
+    """
+    Rank candidate premises in one vectorized pass.
+
+    ``rows`` are tuples of ``CANDIDATE_FIELDS``. Returns ``(ids, scores,
+    distances)`` ordered best first; ``distances`` is ``None`` without a
+    location. Candidates outside ``radius_km`` are dropped.
+    """
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), None if lat is None else np.empty(0)
+
+    ids, lats, lngs, available, total, rating, rates = zip(*rows)
+    ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+    available = np.array(available, dtype=np.float64)
+    total = np.array(total, dtype=np.float64)
+    rating = np.array(rating, dtype=np.float64)
+    # NULL rates (unparseable prices) become NaN.
+    rates = np.array(rates, dtype=np.float64)
+
+    free_ratio = np.divide(available, total, out=np.zeros_like(available), where=total > 0)
+    score = (
+        WEIGHTS['availability'] * np.clip(free_ratio, 0.0, 1.0)
+        + WEIGHTS['rating'] * np.clip(rating / 5.0, 0.0, 1.0)
+        # Cheaper is better; unknown prices score zero on this component.
+        + WEIGHTS['price'] * np.where(np.isnan(rates), 0.0, 1.0 - _normalize(rates))
+    )
+
+    distances = None
+    if lat is not None:
+        distances = haversine_km(lat, lng, np.array(lats, dtype=np.float64), np.array(lngs, dtype=np.float64))
+        proximity = 1.0 - distances / radius_km if radius_km else np.ones_like(distances)
+        score += WEIGHTS['distance'] * proximity
+
+    # Full spots are never "best".
+    score[available <= 0] = 0.0
+
+    if distances is not None:
+        keep = distances <= radius_km
+        ids, score, distances = ids[keep], score[keep], distances[keep]
+
+    order = np.argsort(-score, kind='stable')
+    return ids[order], score[order], None if distances is None else distances[order]
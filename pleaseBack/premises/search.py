@@ -0,0 +1,201 @@
+"""
+Ranked, typo-tolerant premise search over name, location and description.
+
+PostgreSQL uses the GIN full-text and trigram indexes created in migration
+0005; SQLite uses the ``premises_premise_fts`` FTS5 table (trigram
+tokenizer) kept in sync by triggers. Both return premise ids, best first.
+Callers pass their filtered queryset so filters apply before the result cap.
+
+SQLite drops a table's triggers whenever Django rebuilds it (many
+``AlterField`` operations do), so ``ensure_sqlite_triggers`` recreates
+them after every ``migrate``.
+"""
+import re
+
+from django.db import connection
+
+MAX_RESULTS = 200
+# Minimum share of the query's trigrams a fuzzy match has to contain.
+MIN_SIMILARITY = 0.5
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(location, '') "
+    "|| ' ' || coalesce(description, ''))"
+)
+PG_TRIGRAM_TEXT = "(coalesce(name, '') || ' ' || coalesce(location, ''))"
+
+
+def search_terms(query):
+    return [term.lower() for term in _TERM_RE.findall(query or '')]
+
+
+def search_premise_ids(query, limit=MAX_RESULTS, queryset=None):
+    """Ids of premises matching ``query``, best first, restricted to ``queryset`` if given."""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(terms, limit, queryset)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(terms, limit, queryset)
+    return _search_fallback(terms, limit, queryset)
+
+
+def _restriction(column, queryset):
+    """``AND <column> IN (<queryset ids>)`` and its params; empty when unfiltered."""
+    if queryset is None or not queryset.query.has_filters():
+        return '', []
+    sql, params = queryset.order_by().values('id').query.sql_with_params()
+    return f"AND {column} IN ({sql})", list(params)
+
+
+def _merge(exact, fuzzy, limit):
+    seen = set(exact)
+    return (exact + [pk for pk in fuzzy if pk not in seen])[:limit]
+
+
+def _search_postgresql(terms, limit, queryset):
+    tsquery = ' & '.join(f"{term}:*" for term in terms)
+    text = ' '.join(terms)
+    restrict, restrict_params = _restriction('id', queryset)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT id FROM premises_premise
+            WHERE {PG_DOCUMENT} @@ to_tsquery('simple', %s) {restrict}
+            ORDER BY ts_rank_cd({PG_DOCUMENT}, to_tsquery('simple', %s)) DESC, id
+            LIMIT %s
+            """,
+            [tsquery, *restrict_params, tsquery, limit],
+        )
+        exact = [row[0] for row in cursor.fetchall()]
+        if len(exact) >= limit:
+            return exact
+        # Typo tolerance: pg_trgm word similarity, served by the trigram index.
+        cursor.execute(
+            f"""
+            SELECT id FROM premises_premise
+            WHERE %s <%% {PG_TRIGRAM_TEXT} {restrict}
+            ORDER BY word_similarity(%s, {PG_TRIGRAM_TEXT}) DESC, id
+            LIMIT %s
+            """,
+            [text, *restrict_params, text, limit],
+        )
+        fuzzy = [row[0] for row in cursor.fetchall()]
+    return _merge(exact, fuzzy, limit)
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def _search_sqlite(terms, limit, queryset):
+    long_terms = [term for term in terms if len(term) >= 3]
+    if not long_terms:
+        # The trigram index cannot match fewer than three characters.
+        return _search_fallback(terms, limit, queryset)
+
+    restrict, restrict_params = _restriction('rowid', queryset)
+    with connection.cursor() as cursor:
+        # Every term must appear as a substring, ranked by BM25.
+        cursor.execute(
+            f"""
+            SELECT rowid FROM premises_premise_fts
+            WHERE premises_premise_fts MATCH %s {restrict}
+            ORDER BY bm25(premises_premise_fts, 10.0, 5.0, 1.0), rowid
+            LIMIT %s
+            """,
+            [' AND '.join(_quote(term) for term in long_terms), *restrict_params, limit],
+        )
+        exact = [row[0] for row in cursor.fetchall()]
+        if len(exact) >= limit:
+            return exact
+
+        # Typo tolerance: match any trigram of the query, then keep rows that
+        # share enough of them with the query.
+        grams = set().union(*(_trigrams(term) for term in long_terms))
+        cursor.execute(
+            f"""
+            SELECT rowid, name, location FROM premises_premise_fts
+            WHERE premises_premise_fts MATCH %s {restrict}
+            ORDER BY bm25(premises_premise_fts, 10.0, 5.0, 1.0), rowid
+            LIMIT %s
+            """,
+            [' OR '.join(_quote(gram) for gram in sorted(grams)), *restrict_params, MAX_RESULTS],
+        )
+        scored = []
+        for pk, name, location in cursor.fetchall():
+            text = f"{name} {location}".lower()
+            similarity = sum(1 for gram in grams if gram in text) / len(grams)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((-similarity, pk))
+    scored.sort()
+    return _merge(exact, [pk for _, pk in scored], limit)
+
+
+def _search_fallback(terms, limit, queryset):
+    from django.db.models import Q
+
+    from .models import Premise
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(location__icontains=term)
+    queryset = Premise.objects.all() if queryset is None else queryset
+    return list(queryset.filter(condition).order_by('id').values_list('id', flat=True)[:limit])
+
+
+SQLITE_TRIGGERS = {
+    'premises_premise_fts_ai': """
+    CREATE TRIGGER IF NOT EXISTS premises_premise_fts_ai AFTER INSERT ON premises_premise BEGIN
+        INSERT INTO premises_premise_fts(rowid, name, location, description)
+        VALUES (new.id, new.name, new.location, new.description);
+    END
+    """,
+    'premises_premise_fts_ad': """
+    CREATE TRIGGER IF NOT EXISTS premises_premise_fts_ad AFTER DELETE ON premises_premise BEGIN
+        INSERT INTO premises_premise_fts(premises_premise_fts, rowid, name, location, description)
+        VALUES ('delete', old.id, old.name, old.location, old.description);
+    END
+    """,
+    'premises_premise_fts_au': """
+    CREATE TRIGGER IF NOT EXISTS premises_premise_fts_au
+    AFTER UPDATE OF name, location, description ON premises_premise BEGIN
+        INSERT INTO premises_premise_fts(premises_premise_fts, rowid, name, location, description)
+        VALUES ('delete', old.id, old.name, old.location, old.description);
+        INSERT INTO premises_premise_fts(rowid, name, location, description)
+        VALUES (new.id, new.name, new.location, new.description);
+    END
+    """,
+}
+
+
+def ensure_sqlite_triggers(using='default', **kwargs):
+    """
+    ``post_migrate`` hook: recreate any missing FTS sync trigger and rebuild
+    the index from the table, since rows changed without them were missed.
+    Does nothing before migration 0005 has created the FTS table.
+    """
+    from django.db import connections
+
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND name LIKE %s)",
+            ['premises_premise_fts', 'premises_premise_fts_%'],
+        )
+        existing = {name for _, name in cursor.fetchall()}
+        if 'premises_premise_fts' not in existing or existing >= set(SQLITE_TRIGGERS):
+            return
+        for name, sql in SQLITE_TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(sql)
+        cursor.execute("INSERT INTO premises_premise_fts(premises_premise_fts) VALUES ('rebuild')")
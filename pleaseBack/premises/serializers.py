@@ -1,7 +1,17 @@
 from rest_framework import serializers
+from backend.fieldsets import SparseFieldsetMixin
 from .models import Premise
 
-class PremiseSerializer(serializers.ModelSerializer):
+class PremiseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Premise
-        fields = '__all__'
+        exclude = ['geo_cell']
+
+
+class NearbyPremiseSerializer(PremiseSerializer):
+    distance_km = serializers.FloatField(read_only=True)
+
+
+class RankedPremiseSerializer(PremiseSerializer):
+    distance_km = serializers.FloatField(read_only=True, allow_null=True)
+    score = serializers.FloatField(read_only=True)
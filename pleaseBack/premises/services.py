@@ -0,0 +1,91 @@
+from django.db.models import Q
+
+from .geo import bounding_box, cells_in_box, haversine_km, longitude_ranges
+from .scoring import CANDIDATE_FIELDS, score_premises
+from .spatial import get_premise_index
+
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def nearest_premises(queryset, lat, lng, radius_km=DEFAULT_RADIUS_KM, limit=DEFAULT_LIMIT, exclude=None):
+    """
+    Return up to ``limit`` premises within ``radius_km`` of (lat, lng), closest
+    first. Each premise gets a ``distance_km`` attribute.
+
+    Candidates and distances come from the in-process spatial index; the
+    database is only asked for the matching rows by primary key.
+    """
+    matches = get_premise_index().nearest(lat, lng, limit + (1 if exclude else 0), radius_km)
+    matches = [(d, pk) for d, pk in matches if pk != exclude][:limit]
+    rows = queryset.in_bulk([pk for _, pk in matches])
+
+    results = []
+    for distance, pk in matches:
+        premise = rows.get(pk)
+        if premise is not None:
+            premise.distance_km = round(distance, 3)
+            results.append(premise)
+    return results
+
+
+def best_premises(queryset, lat=None, lng=None, radius_km=DEFAULT_RADIUS_KM, limit=DEFAULT_LIMIT):
+    """
+    Return the ``limit`` best premises by the weighted score in
+    ``premises.scoring``, each with ``score`` and ``distance_km`` attributes.
+    With a location only premises within ``radius_km`` are considered.
+    """
+    if lat is not None:
+        queryset = _within_box(queryset, lat, lng, radius_km)
+    rows = list(queryset.values_list(*CANDIDATE_FIELDS))
+    ids, scores, distances = score_premises(rows, lat, lng, radius_km)
+
+    ids = ids[:limit].tolist()
+    premises = queryset.in_bulk(ids)
+    results = []
+    for i, pk in enumerate(ids):
+        premise = premises[pk]
+        premise.score = round(float(scores[i]), 4)
+        premise.distance_km = None if distances is None else round(float(distances[i]), 3)
+        results.append(premise)
+    return results
+
+
+def _within_box(queryset, lat, lng, radius_km):
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    # A box crossing the antimeridian is two longitude ranges.
+    longitudes = Q()
+    for lng_range in longitude_ranges(min_lng, max_lng):
+        longitudes |= Q(longitude__range=lng_range)
+    return queryset.filter(
+        longitudes,
+        geo_cell__in=cells_in_box(min_lat, max_lat, min_lng, max_lng),
+        latitude__range=(min_lat, max_lat),
+    )
+
+
+def nearest_premises_sql(queryset, lat, lng, radius_km=DEFAULT_RADIUS_KM, limit=DEFAULT_LIMIT):
+    """
+    Database-only variant of ``nearest_premises``.
+
+    The lookup is narrowed to the grid buckets overlapping the search radius
+    (``geo_cell`` is indexed), then to the exact bounding box, so only nearby
+    rows are read no matter how large the table is.
+    """
+    matches = []
+    for pk, plat, plng in _within_box(queryset, lat, lng, radius_km).values_list('id', 'latitude', 'longitude'):
+        distance = haversine_km(lat, lng, plat, plng)
+        if distance <= radius_km:
+            matches.append((distance, pk))
+    matches.sort()
+    matches = matches[:limit]
+
+    rows = queryset.in_bulk([pk for _, pk in matches])
+    results = []
+    for distance, pk in matches:
+        premise = rows[pk]
+        premise.distance_km = round(distance, 3)
+        results.append(premise)
+    return results
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import record_premise_changes
+from .events import publish_availability
+from .features import feature_tags
+from .models import Premise, PremiseFeature
+from . import spatial, suggest
+
+
+@receiver(post_save, sender=Premise)
+def invalidate_premise_cache(sender, instance, **kwargs):
+    record_premise_changes([instance.pk], 'saved')
+
+
+@receiver(post_delete, sender=Premise)
+def invalidate_deleted_premise_cache(sender, instance, **kwargs):
+    record_premise_changes([instance.pk], 'deleted')
+
+
+@receiver(post_save, sender=Premise)
+def publish_premise_availability(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'available' in update_fields:
+        publish_availability(instance.pk, instance.available)
+
+
+@receiver(post_save, sender=Premise)
+def sync_feature_tags(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'features' not in update_fields:
+        return
+    wanted = feature_tags(instance.features)
+    existing = set() if created else set(
+        PremiseFeature.objects.filter(premise=instance).values_list('tag', flat=True)
+    )
+    if existing - wanted:
+        PremiseFeature.objects.filter(premise=instance, tag__in=existing - wanted).delete()
+    if wanted - existing:
+        PremiseFeature.objects.bulk_create(
+            [PremiseFeature(premise=instance, tag=tag) for tag in wanted - existing],
+            ignore_conflicts=True,
+        )
+
+
+@receiver(post_save, sender=Premise)
+def index_premise(sender, instance, **kwargs):
+    if spatial.index_is_built():
+        transaction.on_commit(
+            lambda: spatial.premise_index.upsert(instance.pk, instance.latitude, instance.longitude)
+        )
+    if suggest.index_is_built():
+        transaction.on_commit(
+            lambda: suggest.suggest_index.upsert(instance.pk, instance.name, instance.location)
+        )
+
+
+@receiver(post_delete, sender=Premise)
+def unindex_premise(sender, instance, **kwargs):
+    pk = instance.pk
+    if spatial.index_is_built():
+        transaction.on_commit(lambda: spatial.premise_index.remove(pk))
+    if suggest.index_is_built():
+        transaction.on_commit(lambda: suggest.suggest_index.remove(pk))
@@ -0,0 +1,199 @@
+import math
+import threading
+
+from .changes import ChangeFeed
+from .geo import EARTH_RADIUS_KM, GRID_CELL_DEG, GRID_COLUMNS, bounding_box, cell_index, haversine_km
+
+
+class SpatialIndex:
+    """
+    In-memory grid index of premise coordinates.
+
+    Points are bucketed into the same ``GRID_CELL_DEG`` cells used for
+    ``Premise.geo_cell``. Nearest-neighbour queries walk rings of cells
+    outwards from the query point and stop as soon as no unvisited cell can
+    hold a closer point, so a lookup touches a handful of buckets regardless
+    of how many premises are indexed. Rings are clipped to the radius's
+    bounding box, and columns wrap around at the antimeridian.
+    """
+
+    def __init__(self):
+        self._cells = {}
+        self._points = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, premise_id):
+        return premise_id in self._points
+
+    def position(self, premise_id):
+        point = self._points.get(premise_id)
+        return None if point is None else point[1:]
+
+    def load(self, points):
+        """Replace the index contents with ``(id, lat, lng)`` tuples."""
+        cells, positions = {}, {}
+        for premise_id, lat, lng in points:
+            cell = _cell(lat, lng)
+            cells.setdefault(cell, {})[premise_id] = (lat, lng)
+            positions[premise_id] = (cell, lat, lng)
+        with self._lock:
+            self._cells, self._points = cells, positions
+
+    def upsert(self, premise_id, lat, lng):
+        cell = _cell(lat, lng)
+        with self._lock:
+            self._discard(premise_id)
+            self._cells.setdefault(cell, {})[premise_id] = (lat, lng)
+            self._points[premise_id] = (cell, lat, lng)
+
+    def remove(self, premise_id):
+        with self._lock:
+            self._discard(premise_id)
+
+    def _discard(self, premise_id):
+        previous = self._points.pop(premise_id, None)
+        if previous is None:
+            return
+        bucket = self._cells.get(previous[0])
+        if bucket is not None:
+            bucket.pop(premise_id, None)
+            if not bucket:
+                del self._cells[previous[0]]
+
+    def nearest(self, lat, lng, k, radius_km):
+        """
+        Up to ``k`` ``(distance_km, premise_id)`` pairs within ``radius_km``
+        of (lat, lng), closest first.
+        """
+        row0, col0 = cell_index(lat, lng)
+        cos_lat = math.cos(math.radians(lat))
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        min_row, max_row = cell_index(min_lat, lng)[0], cell_index(max_lat, lng)[0]
+        if max_lng - min_lng >= 360.0:
+            col_span = GRID_COLUMNS // 2
+        else:
+            col_span = max(col0 - cell_index(lat, min_lng)[1], cell_index(lat, max_lng)[1] - col0)
+        # No cell beyond this ring overlaps the bounding box.
+        last_ring = max(row0 - min_row, max_row - row0, col_span)
+        found = []
+        ring = 0
+        with self._lock:
+            cells = self._cells
+            while True:
+                for cell in _ring_cells(row0, col0, ring, min_row, max_row, col_span):
+                    bucket = cells.get(cell)
+                    if not bucket:
+                        continue
+                    for premise_id, (plat, plng) in bucket.items():
+                        distance = haversine_km(lat, lng, plat, plng)
+                        if distance <= radius_km:
+                            found.append((distance, premise_id))
+
+                if ring >= last_ring:
+                    break
+                # Anything outside the block of visited cells is at least
+                # ``bound`` km away.
+                bound = _block_clearance_km(lat, lng, cos_lat, row0, col0, ring)
+                if bound >= radius_km:
+                    break
+                if len(found) >= k:
+                    found.sort()
+                    if found[k - 1][0] <= bound:
+                        break
+                ring += 1
+
+        found.sort()
+        return found[:k]
+
+
+def _wrap_col(col):
+    half = GRID_COLUMNS // 2
+    return (col + half) % GRID_COLUMNS - half
+
+
+def _cell(lat, lng):
+    row, col = cell_index(lat, lng)
+    return row, _wrap_col(col)
+
+
+def _ring_cells(row0, col0, ring, min_row, max_row, col_span):
+    """
+    The cells ``ring`` steps from (row0, col0) that lie within rows
+    ``min_row``..``max_row`` and ``col_span`` columns either side, with
+    columns wrapped; a cell is never yielded twice across rings.
+    """
+    if ring == 0:
+        yield (row0, _wrap_col(col0))
+        return
+    span = min(ring, col_span)
+    # Past half the globe the two ends of a row meet.
+    cols = range(col0 - span, min(col0 + span, col0 - span + GRID_COLUMNS - 1) + 1)
+    for row in {row0 - ring, row0 + ring}:
+        if min_row <= row <= max_row:
+            for col in cols:
+                yield (row, _wrap_col(col))
+    if ring <= col_span:
+        sides = {_wrap_col(col0 - ring), _wrap_col(col0 + ring)}
+        for row in range(max(row0 - ring + 1, min_row), min(row0 + ring - 1, max_row) + 1):
+            for col in sides:
+                yield (row, col)
+
+
+def _block_clearance_km(lat, lng, cos_lat, row0, col0, ring):
+    min_lat = (row0 - ring) * GRID_CELL_DEG
+    max_lat = (row0 + ring + 1) * GRID_CELL_DEG
+    min_lng = (col0 - ring) * GRID_CELL_DEG
+    max_lng = (col0 + ring + 1) * GRID_CELL_DEG
+
+    dlat = min(lat - min_lat, max_lat - lat)
+    lat_km = math.radians(dlat) * EARTH_RADIUS_KM
+    # Distance from the point to the nearest bounding meridian.
+    dlng = math.radians(min(lng - min_lng, max_lng - lng, 90.0))
+    lng_km = math.asin(min(1.0, cos_lat * math.sin(dlng))) * EARTH_RADIUS_KM
+    return min(lat_km, lng_km)
+
+
+# Seconds between checks of the change log for premises saved or deleted
+# by other processes.
+SYNC_INTERVAL = 5
+
+premise_index = SpatialIndex()
+_build_lock = threading.Lock()
+_built = False
+_changes = ChangeFeed(kinds=('saved', 'deleted'), interval=SYNC_INTERVAL)
+
+
+def get_premise_index():
+    """
+    The process-wide premise index, loaded from the database on first use.
+    Each worker process holds its own copy: the signal handlers in
+    ``premises.signals`` apply this process's changes at once, and changes
+    logged by other processes are picked up every ``SYNC_INTERVAL`` seconds.
+    """
+    global _built
+    from .models import Premise
+
+    if not _built:
+        with _build_lock:
+            if not _built:
+                # Follow the log from before the load so nothing falls between.
+                _changes.start()
+                premise_index.load(Premise.objects.values_list('id', 'latitude', 'longitude').iterator())
+                _built = True
+    else:
+        changed = _changes.changed_premise_ids()
+        if changed:
+            found = Premise.objects.filter(pk__in=changed).values_list('id', 'latitude', 'longitude')
+            for premise_id, lat, lng in found:
+                premise_index.upsert(premise_id, lat, lng)
+                changed.discard(premise_id)
+            for premise_id in changed:
+                premise_index.remove(premise_id)
+    return premise_index
+
+
+def index_is_built():
+    return _built
@@ -0,0 +1,126 @@
+import bisect
+import re
+import threading
+
+from .changes import ChangeFeed
+
+_WORD_START_RE = re.compile(r'\b\w', re.UNICODE)
+
+SUGGEST_FIELDS = ('name', 'location')
+
+
+def normalize(text):
+    return ' '.join((text or '').casefold().split())
+
+
+class SuggestIndex:
+    """
+    Sorted array of ``(key, field, text, premise_id)`` entries searched with
+    ``bisect``. Every word of a premise's name and location starts a key, so
+    ``"mall"`` completes ``"Alkapuri Mall Parking"``.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._by_premise = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._by_premise)
+
+    @staticmethod
+    def _entries_for(premise_id, values):
+        entries = []
+        for field, text in zip(SUGGEST_FIELDS, values):
+            normalized = normalize(text)
+            for match in _WORD_START_RE.finditer(normalized):
+                entries.append((normalized[match.start():], field, text, premise_id))
+        return entries
+
+    def load(self, rows):
+        """Replace the contents with ``(id, name, location)`` rows."""
+        by_premise = {pk: self._entries_for(pk, values) for pk, *values in rows}
+        entries = sorted(entry for group in by_premise.values() for entry in group)
+        with self._lock:
+            self._entries, self._by_premise = entries, by_premise
+
+    def upsert(self, premise_id, name, location):
+        new = self._entries_for(premise_id, (name, location))
+        with self._lock:
+            self._discard(premise_id)
+            for entry in new:
+                bisect.insort(self._entries, entry)
+            self._by_premise[premise_id] = new
+
+    def remove(self, premise_id):
+        with self._lock:
+            self._discard(premise_id)
+
+    def _discard(self, premise_id):
+        for entry in self._by_premise.pop(premise_id, ()):
+            i = bisect.bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def suggest(self, prefix, limit=8):
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        results, seen = [], set()
+        with self._lock:
+            entries = self._entries
+            i = bisect.bisect_left(entries, (prefix,))
+            while i < len(entries) and len(results) < limit:
+                key, field, text, premise_id = entries[i]
+                if not key.startswith(prefix):
+                    break
+                # Names identify one premise; locations are shared.
+                ident = (field, text if field == 'location' else premise_id)
+                if ident not in seen:
+                    seen.add(ident)
+                    suggestion = {'text': text, 'type': field}
+                    if field == 'name':
+                        suggestion['premise_id'] = premise_id
+                    results.append(suggestion)
+                i += 1
+        return results
+
+
+# Seconds between checks of the change log for other processes' edits.
+SYNC_INTERVAL = 5
+
+suggest_index = SuggestIndex()
+_build_lock = threading.Lock()
+_built = False
+_changes = ChangeFeed(kinds=('saved', 'deleted'), interval=SYNC_INTERVAL)
+
+
+def get_suggest_index():
+    """
+    Process-wide suggest index, built on first use. Local edits are applied
+    by ``premises.signals``; other processes' every ``SYNC_INTERVAL`` seconds.
+    """
+    global _built
+    from .models import Premise
+
+    if not _built:
+        with _build_lock:
+            if not _built:
+                _changes.start()
+                suggest_index.load(Premise.objects.values_list('id', *SUGGEST_FIELDS).iterator())
+                _built = True
+    else:
+        changed = _changes.changed_premise_ids()
+        if changed:
+            for premise_id, name, location in (
+                Premise.objects.filter(pk__in=changed).values_list('id', *SUGGEST_FIELDS)
+            ):
+                suggest_index.upsert(premise_id, name, location)
+                changed.discard(premise_id)
+            for premise_id in changed:
+                suggest_index.remove(premise_id)
+    return suggest_index
+
+
+def index_is_built():
+    return _built
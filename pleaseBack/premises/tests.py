@@ -1,3 +1,609 @@
-from django.test import TestCase
+import asyncio
+import random
+import time
+import warnings
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from unittest import mock, skipUnless
+
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import services, spatial, suggest
+from .geo import haversine_km
+from .models import Premise, PremiseChange
+from .cache import premises_version
+from .events import ChangeLogBroker, InProcessBroker
+from .pricing import ParsedPrice, parse_price, total_price
+from .scoring import WEIGHTS, score_premises
+from .search import ensure_sqlite_triggers, search_premise_ids
+
+CENTER = (22.3072, 73.1812)
+
+
+def make_premise(**kwargs):
+    defaults = dict(
+        name='Test Parking', location='Alkapuri, Vadodara', latitude=CENTER[0], longitude=CENTER[1],
+        price='₹20/hour', available=2, total=2,
+    )
+    defaults.update(kwargs)
+    return Premise.objects.create(**defaults)
+
+
+def scatter_premises(count, spread=0.3, seed=7):
+    rng = random.Random(seed)
+    return [
+        make_premise(
+            name=f'Spot {i}',
+            latitude=CENTER[0] + rng.uniform(-spread, spread),
+            longitude=CENTER[1] + rng.uniform(-spread, spread),
+        )
+        for i in range(count)
+    ]
+
+
+def reset_caches():
+    # The in-memory indexes and cached payloads are per process and outlive
+    # each test's rollback.
+    spatial._built = False
+    suggest._built = False
+    cache.clear()
+
+
+class NearestPremisesTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.premises = scatter_premises(60)
+        self.client = APIClient()
+
+    def brute_force(self, radius_km, limit):
+        distances = sorted(
+            (haversine_km(CENTER[0], CENTER[1], p.latitude, p.longitude), p.pk) for p in self.premises
+        )
+        return [pk for distance, pk in distances if distance <= radius_km][:limit]
+
+    def test_nearest_matches_brute_force(self):
+        for radius_km, limit in ((5, 10), (15, 100), (50, 7)):
+            expected = self.brute_force(radius_km, limit)
+            response = self.client.get('/api/premises/', {
+                'lat': CENTER[0], 'lng': CENTER[1], 'radius_km': radius_km, 'limit': limit,
+            })
+            self.assertEqual([row['id'] for row in response.data], expected)
+            sql = services.nearest_premises_sql(Premise.objects.all(), *CENTER, radius_km, limit)
+            self.assertEqual([p.pk for p in sql], expected)
+
+    def test_distances_are_non_decreasing(self):
+        response = self.client.get('/api/premises/', {'lat': CENTER[0], 'lng': CENTER[1], 'radius_km': 50})
+        distances = [row['distance_km'] for row in response.data]
+        self.assertEqual(distances, sorted(distances))
+        self.assertTrue(all(distance <= 50 for distance in distances))
+
+    def test_non_finite_numbers_are_rejected(self):
+        for params in ({'lat': 'nan', 'lng': 73}, {'lat': 22, 'lng': 'inf'},
+                       {'lat': 22, 'lng': 73, 'limit': 'nan'}, {'lat': 22, 'lng': 73, 'radius_km': '-inf'}):
+            response = self.client.get('/api/premises/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class SpatialEdgeTests(TestCase):
+    def setUp(self):
+        reset_caches()
+
+    def nearest(self, lat, lng, radius_km):
+        queryset = Premise.objects.all()
+        from_index = [p.pk for p in services.nearest_premises(queryset, lat, lng, radius_km, 10)]
+        from_sql = [p.pk for p in services.nearest_premises_sql(queryset, lat, lng, radius_km, 10)]
+        self.assertEqual(from_index, from_sql)
+        return from_index
+
+    def test_antimeridian(self):
+        west = make_premise(name='West', latitude=-16.5, longitude=-179.99)
+        east = make_premise(name='East', latitude=-16.5, longitude=179.999)
+        self.assertEqual(self.nearest(-16.5, 179.995, 5), [east.pk, west.pk])
+        self.assertEqual(self.nearest(-16.5, -179.995, 5), [west.pk, east.pk])
+
+    def test_near_the_poles(self):
+        near = make_premise(name='Near', latitude=89.99, longitude=10)
+        across = make_premise(name='Across the pole', latitude=89.99, longitude=-170)
+        make_premise(name='South', latitude=-89.99, longitude=0)
+        started = time.perf_counter()
+        self.assertEqual(self.nearest(89.99, 0, 5), [near.pk, across.pk])
+        self.assertEqual(self.nearest(89.99, 0, 50), [near.pk, across.pk])
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+
+class SpatialIndexSyncTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.premises = scatter_premises(40)
+
+    def assertIndexMatchesSql(self):
+        queryset = Premise.objects.all()
+        for radius_km, limit in ((5, 10), (40, 100)):
+            from_index = services.nearest_premises(queryset, *CENTER, radius_km, limit)
+            from_sql = services.nearest_premises_sql(queryset, *CENTER, radius_km, limit)
+            self.assertEqual([p.pk for p in from_index], [p.pk for p in from_sql])
+
+    def test_local_saves_and_deletes(self):
+        self.assertIndexMatchesSql()
+        with self.captureOnCommitCallbacks(execute=True):
+            moved = self.premises[0]
+            moved.latitude, moved.longitude = CENTER
+            moved.save()
+            self.premises[1].delete()
+            make_premise(name='New', latitude=CENTER[0] + 0.001, longitude=CENTER[1])
+        self.assertIndexMatchesSql()
+
+    def test_changes_logged_by_other_processes(self):
+        self.assertIndexMatchesSql()
+        moved, gone = self.premises[2], self.premises[3]
+        # Written by another process: no signals reach this one.
+        Premise.objects.filter(pk=moved.pk).update(latitude=CENTER[0], longitude=CENTER[1])
+        Premise.objects.filter(pk=gone.pk).delete()
+        PremiseChange.objects.bulk_create([
+            PremiseChange(premise_id=moved.pk, kind='saved'),
+            PremiseChange(premise_id=gone.pk, kind='deleted'),
+        ])
+        self.assertEqual(spatial.premise_index.position(moved.pk), (moved.latitude, moved.longitude))
+
+        spatial._changes._next_poll = 0
+        self.assertIndexMatchesSql()
+        self.assertEqual(spatial.premise_index.position(moved.pk), CENTER)
+        self.assertNotIn(gone.pk, spatial.premise_index)
+
+
+class ScoringTests(TestCase):
+    def reference_scores(self, rows, lat, lng, radius_km):
+        rates = [row[6] for row in rows if row[6] is not None]
+        low, high = min(rates), max(rates)
+        scores = {}
+        for pk, p_lat, p_lng, available, total, rating, rate in rows:
+            distance = haversine_km(lat, lng, p_lat, p_lng)
+            if distance > radius_km:
+                continue
+            price = 0.0 if rate is None else 1.0 - (rate - low) / (high - low)
+            score = (
+                WEIGHTS['availability'] * (available / total if total else 0.0)
+                + WEIGHTS['rating'] * rating / 5.0
+                + WEIGHTS['price'] * price
+                + WEIGHTS['distance'] * (1.0 - distance / radius_km)
+            )
+            scores[pk] = score if available > 0 else 0.0
+        return scores
+
+    def test_scores_match_a_plain_python_reference(self):
+        rng = random.Random(3)
+        rows = [
+            (
+                pk, CENTER[0] + rng.uniform(-0.2, 0.2), CENTER[1] + rng.uniform(-0.2, 0.2),
+                rng.randint(0, 5), 5, rng.uniform(0, 5), rng.choice([None, 10, 20, 35, 50]),
+            )
+            for pk in range(1, 201)
+        ]
+        expected = self.reference_scores(rows, *CENTER, 15)
+        ids, scores, distances = score_premises(rows, *CENTER, 15)
+
+        self.assertEqual(set(ids.tolist()), set(expected))
+        for pk, score in zip(ids.tolist(), scores.tolist()):
+            self.assertAlmostEqual(score, expected[pk], places=9)
+        self.assertTrue(all(a >= b for a, b in zip(scores, scores[1:])))
+        self.assertTrue(all(distance <= 15 for distance in distances))
+
+    def test_without_location_or_prices(self):
+        rows = [(1, 0, 0, 1, 4, 5.0, None), (2, 0, 0, 4, 4, 1.0, None), (3, 0, 0, 0, 4, 5.0, None)]
+        with warnings.catch_warnings():
+            # No parseable price must not trip numpy's all-NaN warning.
+            warnings.simplefilter('error')
+            ids, scores, distances = score_premises(rows)
+        self.assertIsNone(distances)
+        self.assertEqual(ids.tolist(), [2, 1, 3])
+        self.assertEqual(scores[-1], 0.0)
+
+    def test_best_endpoint(self):
+        reset_caches()
+        near = make_premise(name='Near', rating=4.5, available=4, total=4)
+        make_premise(name='Far', latitude=CENTER[0] + 0.03, rating=4.5, available=4, total=4)
+        make_premise(name='Full', available=0, total=4, rating=5)
+        response = APIClient().get('/api/premises/', {'sort': 'best', 'lat': CENTER[0], 'lng': CENTER[1]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['name'] for row in response.data], ['Near', 'Far', 'Full'])
+        self.assertEqual(response.data[0]['id'], near.pk)
+        self.assertEqual(response.data[-1]['score'], 0.0)
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        self.premises = [make_premise(name=f'Spot {i}') for i in range(25)]
+
+    def page(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']], response.data['next']
+
+    def test_pages_cover_every_row_once(self):
+        seen, url, params = [], '/api/premises/', {'page_size': 10}
+        while url:
+            ids, url = self.page(url, params)
+            params = None
+            seen += ids
+        self.assertEqual(seen, [p.pk for p in self.premises])
+
+    def test_pages_are_stable_under_concurrent_writes(self):
+        first, next_url = self.page('/api/premises/', {'page_size': 10})
+        # Rows removed from or added after the first page do not shift the next one.
+        Premise.objects.filter(pk__in=first[:5]).delete()
+        added = make_premise(name='Late Spot')
+        second, next_url = self.page(next_url)
+        self.assertEqual(second, [p.pk for p in self.premises[10:20]])
+        third, next_url = self.page(next_url)
+        self.assertEqual(third, [p.pk for p in self.premises[20:]] + [added.pk])
+        self.assertIsNone(next_url)
+
+    def test_page_size_is_capped(self):
+        for i in range(200):
+            make_premise(name=f'Extra {i}')
+        ids, _ = self.page('/api/premises/', {'page_size': 1000})
+        self.assertEqual(len(ids), 200)
+
+
+class ClusterTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        # Three spots in Vadodara, two in Mumbai.
+        for i, (lat, lng) in enumerate([(22.30, 73.18), (22.31, 73.19), (22.32, 73.17),
+                                        (19.07, 72.87), (19.08, 72.88)]):
+            make_premise(name=f'Spot {i}', latitude=lat, longitude=lng, available=1, total=3)
+
+    def clusters(self, bbox, zoom):
+        response = self.client.get('/api/premises/clusters/', {'bbox': bbox, 'zoom': zoom})
+        self.assertEqual(response.status_code, 200)
+        return response.data['clusters']
+
+    def test_counts_and_sums(self):
+        [cluster] = self.clusters('-180,-90,180,90', 0)
+        self.assertEqual((cluster['count'], cluster['available'], cluster['total']), (5, 5, 15))
+
+        clusters = sorted(self.clusters('60,10,90,30', 6), key=lambda c: c['lat'])
+        self.assertEqual([c['count'] for c in clusters], [2, 3])
+        self.assertNotIn('premise_id', clusters[0])
+
+    def test_single_premise_cluster_names_it(self):
+        clusters = self.clusters('72.8,19.0,72.9,19.1', 12)
+        self.assertEqual(len(clusters), 2)
+        self.assertTrue(all('premise_id' in c for c in clusters))
+
+    def test_too_many_tiles_is_rejected_without_listing_them(self):
+        with mock.patch('premises.clustering.tiles_for_bbox') as tiles_for_bbox:
+            response = self.client.get('/api/premises/clusters/', {'bbox': '-180,-90,180,90', 'zoom': 20})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('zoom', response.data)
+        tiles_for_bbox.assert_not_called()
+
+    def test_out_of_range_bbox_is_clamped(self):
+        [cluster] = self.clusters('-400,-100,400,100', 0)
+        self.assertEqual(cluster['count'], 5)
+
+    def test_non_finite_bbox_is_rejected(self):
+        for bbox in ('nan,0,10,10', '0,0,inf,10', '-inf,-inf,inf,inf'):
+            response = self.client.get('/api/premises/clusters/', {'bbox': bbox, 'zoom': 3})
+            self.assertEqual(response.status_code, 400, bbox)
+        response = self.client.get('/api/premises/clusters/', {'bbox': '0,0,10,10', 'zoom': 'nan'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PriceTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+
+    def test_parse_price(self):
+        cases = {
+            '₹20/hour': ParsedPrice(Decimal('20'), 'INR', 'hour'),
+            'Rs. 1,200 / day': ParsedPrice(Decimal('1200'), 'INR', 'day'),
+            '$2.50/hr': ParsedPrice(Decimal('2.50'), 'USD', 'hour'),
+            '30': ParsedPrice(Decimal('30'), 'INR', 'hour'),
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_price(text), expected, text)
+        self.assertIsNone(parse_price('Free'))
+        self.assertIsNone(parse_price(''))
+
+    def test_save_derives_rate_and_amount(self):
+        premise = make_premise(price='₹25/day')
+        self.assertEqual(
+            (premise.price_per_hour, premise.price_amount, premise.price_unit),
+            (Decimal('1.04'), Decimal('25'), 'day'),
+        )
+        premise.price = 'Free'
+        premise.save(update_fields=['price'])
+        premise.refresh_from_db()
+        self.assertIsNone(premise.price_per_hour)
+        self.assertIsNone(premise.price_amount)
+
+    def test_totals_are_rounded_once(self):
+        self.assertEqual(total_price(Decimal('25'), 'day', 24), Decimal('25.00'))
+        self.assertEqual(total_price(Decimal('25'), 'day', 5), Decimal('5.21'))
+
+    def test_backfill_fills_unparsed_rows(self):
+        premise = make_premise(price='₹480/day')
+        Premise.objects.filter(pk=premise.pk).update(price_per_hour=None, price_amount=None, price_unit='hour')
+        call_command('backfill_premise_prices', stdout=StringIO())
+        premise.refresh_from_db()
+        self.assertEqual(
+            (premise.price_per_hour, premise.price_amount, premise.price_unit),
+            (Decimal('20.00'), Decimal('480.00'), 'day'),
+        )
+
+    def test_price_filters(self):
+        cheap = make_premise(price='₹10/hour')
+        daily = make_premise(price='₹480/day')
+        make_premise(price='₹50/hour')
+        response = self.client.get('/api/premises/', {'min_price': 5, 'max_price': 20})
+        self.assertEqual(sorted(row['id'] for row in response.data['results']), [cheap.pk, daily.pk])
+        for value in ('NaN', 'Infinity', '-inf', 'abc'):
+            response = self.client.get('/api/premises/', {'min_price': value})
+            self.assertEqual(response.status_code, 400, value)
+
+
+class FeatureFilterTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        self.both = make_premise(features=['EV Charging', 'Covered Parking'])
+        self.ev = make_premise(features=['EV Charging', 'CCTV'])
+        self.covered = make_premise(features=['Covered'])
+
+    def filtered(self, features):
+        response = self.client.get('/api/premises/', {'features': features})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['id'] for row in response.data['results'])
+
+    def test_every_requested_tag_must_match(self):
+        self.assertEqual(self.filtered('ev'), [self.both.pk, self.ev.pk])
+        self.assertEqual(self.filtered('ev,covered'), [self.both.pk])
+        self.assertEqual(self.filtered('EV Charging, cctv'), [self.ev.pk])
+        self.assertEqual(self.filtered('ev,valet'), [])
+
+    def test_tags_follow_feature_edits(self):
+        self.ev.features = ['Covered', 'Valet']
+        self.ev.save()
+        self.assertEqual(self.filtered('covered'), [self.both.pk, self.ev.pk, self.covered.pk])
+        self.assertEqual(self.filtered('ev'), [self.both.pk])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        self.premise = make_premise(description='A very long description ' * 20)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_list_and_detail_return_and_load_only_requested_fields(self):
+        data, sql = self.get('/api/premises/', {'fields': 'id,name,price'})
+        self.assertEqual(data['results'], [{'id': self.premise.pk, 'name': 'Test Parking', 'price': '₹20/hour'}])
+        self.assertNotIn('"description"', sql)
+
+        data, sql = self.get(f'/api/premises/{self.premise.pk}/', {'fields': 'name'})
+        self.assertEqual(data, {'name': 'Test Parking'})
+        self.assertNotIn('"description"', sql)
+
+    def test_computed_fields_can_be_requested(self):
+        data, _ = self.get('/api/premises/', {'lat': CENTER[0], 'lng': CENTER[1], 'fields': 'id,distance_km'})
+        self.assertEqual(data, [{'id': self.premise.pk, 'distance_km': 0.0}])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/premises/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.data['fields']))
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        self.mall = make_premise(name='Alkapuri Mall Parking', location='Alkapuri, Vadodara')
+        self.plaza = make_premise(name='Akota Plaza', location='Akota, Vadodara')
+        make_premise(name='Alkapuri Lane Garage', location='Alkapuri, Vadodara')
+
+    def suggest(self, prefix, **params):
+        response = self.client.get('/api/premises/suggest/', {'prefix': prefix, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_prefix_matches_any_word(self):
+        self.assertEqual(
+            self.suggest('MALL'),
+            [{'text': 'Alkapuri Mall Parking', 'type': 'name', 'premise_id': self.mall.pk}],
+        )
+        self.assertEqual([s['text'] for s in self.suggest('vadodara')], ['Akota, Vadodara', 'Alkapuri, Vadodara'])
+
+    def test_locations_are_deduplicated_and_limited(self):
+        texts = [(s['type'], s['text']) for s in self.suggest('alka')]
+        self.assertEqual(texts, [
+            ('name', 'Alkapuri Lane Garage'),
+            ('name', 'Alkapuri Mall Parking'),
+            ('location', 'Alkapuri, Vadodara'),
+        ])
+        self.assertEqual(len(self.suggest('a', limit=2)), 2)
+        self.assertEqual(self.suggest('  '), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.suggest('a')  # build the index
+        with self.captureOnCommitCallbacks(execute=True):
+            self.plaza.name = 'Akota Square'
+            self.plaza.save()
+        self.assertEqual([s['text'] for s in self.suggest('akota s')], ['Akota Square'])
+        self.assertEqual(self.suggest('plaza'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mall.delete()
+        self.assertEqual(self.suggest('mall'), [])
+
+    def test_index_follows_changes_logged_elsewhere(self):
+        self.suggest('a')
+        Premise.objects.filter(pk=self.plaza.pk).update(name='Akota Square')
+        PremiseChange.objects.create(premise_id=self.plaza.pk, kind='saved')
+        suggest._changes._next_poll = 0
+        self.assertEqual([s['text'] for s in self.suggest('akota s')], ['Akota Square'])
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        self.mall = make_premise(name='Alkapuri Mall Parking', location='Alkapuri, Vadodara')
+        self.station = make_premise(name='Station Road Garage', location='Sayajigunj, Vadodara',
+                                    description='Covered parking near the railway station')
+        self.airport = make_premise(name='Airport Long Stay', location='Harni, Vadodara')
+
+    def search(self, q, **params):
+        response = self.client.get('/api/premises/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_exact_matches_are_ranked_by_field(self):
+        # A name match outranks a description match.
+        self.assertEqual(self.search('parking')[:2], [self.mall.pk, self.station.pk])
+        self.assertEqual(self.search('station garage'), [self.station.pk])
+
+    def test_typos_fall_back_to_fuzzy_matches(self):
+        self.assertEqual(self.search('alkapury'), [self.mall.pk])
+        self.assertEqual(self.search('airprt stay'), [self.airport.pk])
+
+    def test_filters_apply_before_the_result_cap(self):
+        for i in range(30):
+            make_premise(name=f'Parking Lot {i}', price='₹10/hour')
+        pricey = make_premise(name='Parking Lot Deluxe', price='₹90/hour')
+        self.assertEqual(self.search('parking lot', min_price=50, limit=5), [pricey.pk])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5 triggers')
+    def test_missing_triggers_are_recreated(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER premises_premise_fts_au")
+        self.airport.name = 'Harni Airport Plaza'
+        self.airport.save()
+        self.assertEqual(search_premise_ids('plaza'), [])
+
+        ensure_sqlite_triggers()
+        self.assertEqual(search_premise_ids('plaza'), [self.airport.pk])
+        self.mall.name = 'Alkapuri Central Plaza'
+        self.mall.save()
+        self.assertEqual(sorted(search_premise_ids('plaza')), sorted([self.mall.pk, self.airport.pk]))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        reset_caches()
+        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.premise = make_premise()
+
+    def get(self, url='/api/premises/', etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_unchanged_data_is_not_modified(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first['ETag'].startswith('W/"premises-'))
+        with self.assertNumQueries(1):
+            second = self.get(etag=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        # The ETag depends on the query too.
+        self.assertEqual(self.get('/api/premises/?page_size=5', etag=first['ETag']).status_code, 200)
+
+    def test_saves_invalidate_the_etag(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.premise.available = 0
+            self.premise.save()
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['available'], 0)
+
+    def test_changes_recorded_elsewhere_invalidate_the_etag(self):
+        etag = self.get()['ETag']
+        # Another process (the sweeper, say) updates the row and logs the
+        # change; this process's cache knows nothing about it.
+        Premise.objects.filter(pk=self.premise.pk).update(available=1)
+        PremiseChange.objects.create(premise_id=self.premise.pk, kind='availability')
+        response = self.get(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['available'], 1)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_purge_keeps_the_current_version(self):
+        PremiseChange.objects.update(created_at=timezone.now() - timedelta(days=3))
+        version = premises_version()
+        call_command('purge_premise_changes', stdout=StringIO())
+        self.assertEqual(PremiseChange.objects.count(), 1)
+        self.assertEqual(premises_version(), version)
+
+
+class AvailabilityStreamTests(TestCase):
+    def test_needs_asgi(self):
+        response = self.client.get('/api/premises/availability/stream/')
+        self.assertEqual(response.status_code, 501)
+
+    async def test_event_format(self):
+        broker = InProcessBroker()
+        with mock.patch('premises.views.get_broker', return_value=broker):
+            response = await self.async_client.get('/api/premises/availability/stream/', {'premise_ids': '1,2'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+            chunks = aiter(response.streaming_content)
+            self.assertEqual(await anext(chunks), b'retry: 5000\n\n')
+            broker.publish({'premise_id': 3, 'available': 0})
+            broker.publish({'premise_id': 2, 'available': 4})
+            self.assertEqual(
+                await anext(chunks),
+                b'event: availability\ndata: {"premise_id": 2, "available": 4}\n\n',
+            )
+            await chunks.aclose()
+
+    async def test_bad_premise_ids(self):
+        response = await self.async_client.get('/api/premises/availability/stream/', {'premise_ids': 'a,b'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChangeLogBrokerTests(TransactionTestCase):
+    def test_streams_changes_logged_by_any_process(self):
+        premise = make_premise(available=2, total=2)
+        broker = ChangeLogBroker(interval=0.05)
+
+        def change_elsewhere():
+            # What the sweeper cron does: a set-based update plus a log row.
+            Premise.objects.filter(pk=premise.pk).update(available=0)
+            PremiseChange.objects.create(premise_id=premise.pk, kind='availability')
+
+        async def listen():
+            subscription = broker.subscribe()
+            try:
+                await asyncio.to_thread(change_elsewhere)
+                # Events carry the current value, so the creation logged just
+                # before may come first.
+                while True:
+                    event = await asyncio.wait_for(subscription[1].get(), 5)
+                    if event['available'] == 0:
+                        return event
+            finally:
+                broker.unsubscribe(subscription)
+
+        self.assertEqual(asyncio.run(listen()), {'premise_id': premise.pk, 'available': 0})
+        # Direct publishes would duplicate what the log delivers.
+        self.assertTrue(broker.follows_change_log)
@@ -1,7 +1,14 @@
 from django.urls import path
-from .views import PremiseListView, PremiseDetailView
+from .views import (
+    PremiseListView, PremiseDetailView, PremiseNearbyView, PremiseClusterView, PremiseSuggestView,
+    availability_stream,
+)
 
 urlpatterns = [
     path('premises/', PremiseListView.as_view(), name='premises-list'),
+    path('premises/availability/stream/', availability_stream, name='premise-availability-stream'),
+    path('premises/suggest/', PremiseSuggestView.as_view(), name='premise-suggest'),
+    path('premises/clusters/', PremiseClusterView.as_view(), name='premise-clusters'),
     path('premises/<int:pk>/', PremiseDetailView.as_view(), name='premise-detail'),
+    path('premises/<int:pk>/nearby/', PremiseNearbyView.as_view(), name='premise-nearby'),
 ]
@@ -1,12 +1,229 @@
+import asyncio
+import json
+import math
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework import generics
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from backend.fieldsets import SparseFieldsetViewMixin
+from backend.pagination import PremiseCursorPagination
 from .models import Premise
-from .serializers import PremiseSerializer
+from .serializers import PremiseSerializer, NearbyPremiseSerializer, RankedPremiseSerializer
+from . import clustering, services
+from .cache import PremiseVersionCacheMixin
+from .events import get_broker
+from .filters import FeatureFilter, PriceFilter
+from .search import search_premise_ids
+from .spatial import get_premise_index
+from .suggest import get_suggest_index
+
+
+STREAM_HEARTBEAT_SECONDS = 15
+
+
+def _float_param(params, name, default=None, min_value=None, max_value=None):
+    raw = params.get(name)
+    if raw in (None, ''):
+        if default is None:
+            raise ValidationError({name: 'This parameter is required.'})
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValidationError({name: 'A valid number is required.'})
+    if not math.isfinite(value):
+        raise ValidationError({name: 'A finite number is required.'})
+    if (min_value is not None and value < min_value) or (max_value is not None and value > max_value):
+        raise ValidationError({name: f'Must be between {min_value} and {max_value}.'})
+    return value
 
-class PremiseListView(generics.ListAPIView):
+
+def _search_params(params):
+    radius_km = _float_param(
+        params, 'radius_km', services.DEFAULT_RADIUS_KM, 0, services.MAX_RADIUS_KM
+    )
+    limit = int(_float_param(params, 'limit', services.DEFAULT_LIMIT, 1, services.MAX_LIMIT))
+    return radius_km, limit
+
+
+class PremiseListView(PremiseVersionCacheMixin, SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    Lists premises. Passing ``lat`` and ``lng`` switches to nearest-spots mode:
+    ``?lat=&lng=&radius_km=&limit=`` returns the closest premises within the
+    radius, ranked by great-circle distance. ``?sort=best`` ranks by the
+    weighted score in ``premises.scoring`` instead (optionally around
+    ``lat``/``lng``). ``?q=`` runs a ranked, typo-tolerant text search over
+    name, location and description. The plain listing is cursor paginated by
+    ``id``.
+    All modes accept ``?min_price=&max_price=`` (hourly rate),
+    ``?features=ev,covered`` and ``?fields=id,name,...``.
+    Responses carry an ETag/Last-Modified tied to the premises version.
+    """
     queryset = Premise.objects.all()
-    serializer_class = PremiseSerializer
+    pagination_class = PremiseCursorPagination
+    filter_backends = [PriceFilter, FeatureFilter]
+
+    serializer_classes = {
+        'list': PremiseSerializer,
+        'search': PremiseSerializer,
+        'nearest': NearbyPremiseSerializer,
+        'best': RankedPremiseSerializer,
+    }
+
+    @property
+    def mode(self):
+        params = self.request.query_params
+        if params.get('q'):
+            return 'search'
+        if params.get('sort') == 'best':
+            return 'best'
+        if 'lat' in params or 'lng' in params:
+            return 'nearest'
+        return 'list'
+
+    def get_serializer_class(self):
+        return self.serializer_classes[self.mode]
+
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
+    def list(self, request, *args, **kwargs):
+        mode = self.mode
+        if mode == 'list':
+            return super().list(request, *args, **kwargs)
+        premises = getattr(self, mode)(request.query_params)
+        return Response(self.get_serializer(premises, many=True).data)
+
+    def nearest(self, params):
+        lat = _float_param(params, 'lat', min_value=-90, max_value=90)
+        lng = _float_param(params, 'lng', min_value=-180, max_value=180)
+        radius_km, limit = _search_params(params)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if queryset.query.has_filters():
+            # The in-memory index knows nothing about the other filters.
+            return services.nearest_premises_sql(queryset, lat, lng, radius_km, limit)
+        return services.nearest_premises(queryset, lat, lng, radius_km, limit)
+
+    def search(self, params):
+        _, limit = _search_params(params)
+        queryset = self.filter_queryset(self.get_queryset())
+        ids = search_premise_ids(params['q'], limit, queryset)
+        premises = queryset.in_bulk(ids)
+        return [premises[pk] for pk in ids if pk in premises]
+
+    def best(self, params):
+        lat = lng = None
+        if 'lat' in params or 'lng' in params:
+            lat = _float_param(params, 'lat', min_value=-90, max_value=90)
+            lng = _float_param(params, 'lng', min_value=-180, max_value=180)
+        radius_km, limit = _search_params(params)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return services.best_premises(queryset, lat, lng, radius_km, limit)
 
-class PremiseDetailView(generics.RetrieveAPIView):
+class PremiseDetailView(PremiseVersionCacheMixin, SparseFieldsetViewMixin, generics.RetrieveAPIView):
     queryset = Premise.objects.all()
     serializer_class = PremiseSerializer
 
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
+
+class PremiseNearbyView(SparseFieldsetViewMixin, generics.ListAPIView):
+    """Premises closest to premise ``pk``: ``?radius_km=&limit=``."""
+    queryset = Premise.objects.all()
+    serializer_class = NearbyPremiseSerializer
+
+    def get_queryset(self):
+        return self.sparse_queryset(super().get_queryset())
+
+    def list(self, request, pk, *args, **kwargs):
+        position = get_premise_index().position(pk)
+        if position is None:
+            raise NotFound()
+        radius_km, limit = _search_params(request.query_params)
+        premises = services.nearest_premises(
+            self.get_queryset(), position[0], position[1], radius_km, limit, exclude=pk
+        )
+        return Response(self.get_serializer(premises, many=True).data)
+
+
+class PremiseClusterView(APIView):
+    """
+    Pre-aggregated map clusters for zoomed-out views:
+    ``?bbox=min_lng,min_lat,max_lng,max_lat&zoom=``.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        zoom = int(_float_param(params, 'zoom', min_value=0, max_value=clustering.MAX_ZOOM))
+        try:
+            min_lng, min_lat, max_lng, max_lat = (float(v) for v in params.get('bbox', '').split(','))
+        except ValueError:
+            raise ValidationError({'bbox': 'Expected min_lng,min_lat,max_lng,max_lat.'})
+        if not all(map(math.isfinite, (min_lng, min_lat, max_lng, max_lat))):
+            raise ValidationError({'bbox': 'Coordinates must be finite numbers.'})
+        # Viewports may extend past the poles or the antimeridian.
+        min_lng, max_lng = (min(max(v, -180.0), 180.0) for v in (min_lng, max_lng))
+        min_lat, max_lat = (min(max(v, -90.0), 90.0) for v in (min_lat, max_lat))
+        if min_lng > max_lng or min_lat > max_lat:
+            raise ValidationError({'bbox': 'Minimum corner must be below and left of the maximum.'})
+
+        if clustering.tile_count(min_lng, min_lat, max_lng, max_lat, zoom) > clustering.MAX_TILES:
+            raise ValidationError({'zoom': 'Bounding box covers too many tiles for this zoom level.'})
+
+        clusters = clustering.clusters_for_bbox(min_lng, min_lat, max_lng, max_lat, zoom)
+        return Response({'zoom': zoom, 'clusters': clusters})
+
+
+class PremiseSuggestView(APIView):
+    """Autocomplete for the search box: ``?prefix=&limit=``, answered from memory."""
+
+    def get(self, request):
+        limit = int(_float_param(request.query_params, 'limit', 8, 1, 20))
+        prefix = request.query_params.get('prefix', '')
+        return Response(get_suggest_index().suggest(prefix, limit))
+
+
+async def availability_stream(request):
+    """
+    Server-Sent Events stream of availability deltas
+    (``{"premise_id": .., "available": ..}``). ``?premise_ids=1,2`` limits
+    the stream to those premises. Only served under ASGI: a WSGI worker
+    would be tied up for as long as the client stays connected, so there
+    it answers 501 and clients poll the premise list instead.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The availability stream needs the ASGI server.'}, status=501)
+    try:
+        wanted = {int(pk) for pk in request.GET.get('premise_ids', '').split(',') if pk}
+    except ValueError:
+        return JsonResponse({'premise_ids': 'Expected comma separated ids.'}, status=400)
+
+    broker = get_broker()
+
+    async def events():
+        subscription = broker.subscribe()
+        queue = subscription[1]
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if wanted and event['premise_id'] not in wanted:
+                    continue
+                yield f"event: availability\ndata: {json.dumps(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
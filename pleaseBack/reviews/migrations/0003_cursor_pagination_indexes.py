@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-17 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_alter_review_approved'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['approved', 'created_at'], name='review_approved_created_idx'),
+        ),
+    ]
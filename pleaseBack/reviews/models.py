@@ -10,5 +10,10 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=True)  # For moderation if needed
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['approved', 'created_at'], name='review_approved_created_idx'),
+        ]
+
     def __str__(self):
         return f"Review by {self.name} - {self.rating} stars"
\ No newline at end of file
@@ -119,29 +119,111 @@ export const registerUser = async (username, email, password) => {
   return response.data;
 };
 
+/**
+ * List endpoints are cursor paginated ({ next, previous, results }).
+ * Keep requesting the `next` cursor and return every row.
+ */
+const fetchAllPages = async (url, params = {}) => {
+  let response = await api.get(url, { params });
+  const rows = [...response.data.results];
+  while (response.data.next) {
+    const cursor = new URL(response.data.next).searchParams.get("cursor");
+    response = await api.get(url, { params: { ...params, cursor } });
+    rows.push(...response.data.results);
+  }
+  return rows;
+};
+
 /* =========================
    PREMISES
  ========================= */
 
 export const fetchPremises = async () => {
-  const response = await api.get("/premises/");
-  return response.data;
+  return fetchAllPages("/premises/", { page_size: 200 });
+};
+
+const AVAILABILITY_POLL_MS = 30000;
+
+/**
+ * Live availability deltas ({ premise_id, available }) over Server-Sent Events.
+ * If the stream is refused (501 when the server does not run under ASGI),
+ * polls the premise list instead; unchanged lists come back as 304s.
+ * Returns a function that stops listening.
+ */
+export const subscribeAvailability = (onDelta) => {
+  let stopped = false;
+  let timer = null;
+  const known = new Map();
+
+  const poll = async () => {
+    try {
+      const premises = await fetchPremises();
+      premises.forEach(({ id, available }) => {
+        if (!stopped && known.get(id) !== available) onDelta({ premise_id: id, available });
+        known.set(id, available);
+      });
+    } catch (error) {
+      console.error("Error polling availability:", error);
+    }
+    if (!stopped) timer = setTimeout(poll, AVAILABILITY_POLL_MS);
+  };
+
+  const source = new EventSource(`${api.defaults.baseURL}/premises/availability/stream/`);
+  source.addEventListener("availability", (event) => onDelta(JSON.parse(event.data)));
+  source.onerror = () => {
+    // Dropped connections reconnect by themselves; a refused stream is CLOSED.
+    if (source.readyState === EventSource.CLOSED && timer === null && !stopped) {
+      timer = setTimeout(poll, 0);
+    }
+  };
+
+  return () => {
+    stopped = true;
+    source.close();
+    clearTimeout(timer);
+  };
 };
 
 /* =========================
    BOOKINGS
  ========================= */
 
+// POST that creates something. One Idempotency-Key per call, reused when a
+// network failure makes us retry, so the server never creates it twice.
+// A 409 means an earlier attempt with this key is still unanswered; wait as
+// long as Retry-After says, after which the server lets the retry take over.
+const postIdempotent = async (url, data, retries = 2) => {
+  const headers = { "Idempotency-Key": crypto.randomUUID() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await api.post(url, data, { headers });
+    } catch (error) {
+      const retryAfter = Number(error.response?.headers?.["retry-after"]);
+      const inProgress = error.response?.status === 409 && retryAfter > 0;
+      if ((error.response && !inProgress) || attempt >= retries) throw error;
+      if (inProgress) {
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      }
+    }
+  }
+};
+
 export const createBooking = async (bookingData) => {
-  const response = await api.post("/bookings/bookings/", bookingData);
+  const response = await postIdempotent("/bookings/bookings/", bookingData);
   return response.data;
 };
 
-export const fetchUserBookings = async () => {
-  const response = await api.get("/bookings/user-bookings/");
+export const fetchQuote = async (premiseId, duration) => {
+  const response = await api.get("/bookings/quote/", {
+    params: { premise_id: premiseId, duration },
+  });
   return response.data;
 };
 
+export const fetchUserBookings = async () => {
+  return fetchAllPages("/bookings/user-bookings/", { expand: "premise" });
+};
+
 export const cancelBooking = async (bookingId) => {
   const response = await api.post(`/bookings/bookings/${bookingId}/cancel/`);
   return response.data;
@@ -162,7 +244,7 @@ export const getStripeConfig = async () => {
 };
 
 export const createCheckoutSession = async (planId, billingPeriod, customerEmail) => {
-  const response = await api.post("/create-checkout-session/", {
+  const response = await postIdempotent("/create-checkout-session/", {
     plan_id: planId,
     billing_period: billingPeriod,
     customer_email: customerEmail
@@ -183,8 +265,7 @@ export const verifyPayment = async (sessionId) => {
 ========================= */
 
 export const fetchReviews = async () => {
-  const response = await api.get("/reviews/");
-  return response.data;
+  return fetchAllPages("/reviews/");
 };
 
 export const submitReview = async (reviewData) => {
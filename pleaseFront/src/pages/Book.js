@@ -9,7 +9,7 @@ import { MapContainer, TileLayer, Marker, Popup, useMap } from 'react-leaflet';
 import L from 'leaflet';
 import axios from 'axios';
 import 'leaflet/dist/leaflet.css';
-import { fetchPremises, createBooking } from '../api';
+import { fetchPremises, createBooking, subscribeAvailability, fetchQuote } from '../api';
 
 // Validation constants
 const PHONE_REGEX = /^[6-9]\d{9}$/; // Indian phone numbers
@@ -134,12 +134,28 @@ const Book = () => {
     return 'Other';
   }, []);
 
+  // Server quote for the current premise/duration; the local estimate
+  // below is only shown until it arrives.
+  const [quotedTotal, setQuotedTotal] = useState(null);
+
+  useEffect(() => {
+    setQuotedTotal(null);
+    const duration = parseInt(bookingForm.duration);
+    if (!selectedPremise || !(duration >= 1)) return;
+    let cancelled = false;
+    fetchQuote(selectedPremise.id, duration)
+      .then(quote => { if (!cancelled) setQuotedTotal(quote.total_price); })
+      .catch(() => {});
+    return () => { cancelled = true; };
+  }, [selectedPremise, bookingForm.duration]);
+
   const calculateTotalPrice = useCallback(() => {
+    if (quotedTotal !== null) return quotedTotal;
     if (!selectedPremise?.price) return 0;
     const pricePerHour = parseFloat(selectedPremise.price.replace(/[^0-9.]/g, ''));
     const duration = parseInt(bookingForm.duration);
     return (pricePerHour * duration).toFixed(2);
-  }, [selectedPremise, bookingForm.duration]);
+  }, [selectedPremise, bookingForm.duration, quotedTotal]);
 
   const formatPhoneNumber = (value) => {
     if (!value) return value;
@@ -248,6 +264,18 @@ const Book = () => {
     loadPremises();
   }, [extractCity]);
 
+  useEffect(() => {
+    return subscribeAvailability(({ premise_id, available }) => {
+      setPremises(prev => {
+        const next = {};
+        Object.keys(prev).forEach(city => {
+          next[city] = prev[city].map(p => (p.id === premise_id ? { ...p, available } : p));
+        });
+        return next;
+      });
+    });
+  }, []);
+
   const filteredPremises = (selectedCity ? premises[selectedCity] || [] : Object.values(premises).flat())
     .filter(premise =>
       premise.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
@@ -273,7 +301,7 @@ const Book = () => {
         phone: bookingForm.phone.replace(/\D/g, ''), // Remove non-digits
         duration: bookingForm.duration,
         total_price: calculateTotalPrice(),
-        booking_time: bookingForm.bookingDateTime
+        start_time: new Date(bookingForm.bookingDateTime).toISOString()
       };
 
       const response = await createBooking(bookingData);